@@ -9,6 +9,8 @@ cd /build
 pip install --target ./package -r requirements-lambda.txt
 pip install --target ./package ./wibl-manager
 pip install --target ./package --no-deps .
+# The data simulator isn't used by any of the lambdas, so leave it out of the package
+rm -rf ./package/wibl/simulator
 HERE
 
 # Remove any previous packaging attempt, so it doesn't try to update what's there already
@@ -1,11 +1,15 @@
 import unittest
 from pathlib import Path
 
+import numpy as np
+
 from wibl import config_logger_service
 from wibl.core import Lineage
 import wibl.core.config as conf
 import wibl.core.timestamping as ts
 from wibl.core.algorithm import AlgorithmDescriptor, UnknownAlgorithm, AlgorithmPhase, runner
+import wibl.core.algorithm.deduplicate as dedup
+from wibl.core.algorithm.deduplicate import find_duplicates
 
 
 logger = config_logger_service()
@@ -55,6 +59,27 @@ class TestAlgorithms(unittest.TestCase):
         self.assertEqual('1.0.0', l['version'])
         self.assertEqual('Selected 234 non-duplicate depths from 277 in input.', l['comment'])
 
+    def test_find_duplicates(self):
+        z = np.array([0.0, 0.0, 1.5, 1.5, 1.5, 2.0, 1.5, 0.0, 0.0, 3.0])
+        index = find_duplicates({'depth': {'z': z}}, False)
+        # Leading zero depths are dropped, as are repeats of the previous depth
+        self.assertEqual([2, 5, 6, 7, 9], index.tolist())
+
+        index = find_duplicates({'depth': {'z': np.array([])}}, False)
+        self.assertEqual(0, len(index))
+
+    @unittest.skipIf(dedup._compiled_scan() is None, 'numba is not available')
+    def test_find_duplicates_scan(self):
+        z = np.random.default_rng(42).integers(0, 3, 1000).astype(np.float64)
+        out = np.empty(z.shape[0], dtype=np.int64)
+        n = dedup._compiled_scan()(z, out)
+        self.assertEqual(find_duplicates({'depth': {'z': z}}, False).tolist(), out[:n].tolist())
+
+    def test_phase_handlers(self):
+        self.assertEqual([AlgorithmPhase.AFTER_TIME_INTERP], list(dedup.Deduplicate.handlers))
+        with self.assertRaises(ValueError):
+            dedup.Deduplicate.run(AlgorithmPhase.ON_LOAD, [], '', Lineage(), False)
+
     def test_algo_unknown(self):
         # Initialize
         config_file = Path(self.fixtures_dir, 'configure.local.json')
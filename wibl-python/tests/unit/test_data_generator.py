@@ -1,12 +1,14 @@
 import struct
 import unittest
 import math
+from datetime import date, datetime, timedelta
 
 import xmlrunner
 import numpy as np
 
 from wibl import config_logger_service
 from wibl.core.logger_file import PacketTypes
+import wibl.simulator.data as simdata
 from wibl.simulator.data import DataGenerator, State, FormattedAngle, format_angle, MAX_RAD
 from wibl.simulator.data.writer import Writer, MemoryWriter
 
@@ -31,6 +33,34 @@ class TestDataGenerator(unittest.TestCase):
     """
     def test_compute_checksum(self):
         self.assertEqual(86, DataGenerator.compute_checksum("$GPZDA,000000.000,01,01,2020,00,00*"))
+        # '=' must be checksummed as a plain character, not taken as a quoted-printable escape
+        self.assertEqual(8, DataGenerator.compute_checksum(b"$PXXX,A=1,B=2*"))
+
+    def test_sentence_template(self):
+        msg = simdata.ZDA_SENTENCE.format((0, 0, 0.0, 1, 1, 2020))
+        self.assertEqual(b'$GPZDA,000000.000,01,01,2020,00,00*56\r\n', msg)
+        msg = simdata.DBT_SENTENCE.format((32.808, 10.0, 5.468))
+        self.assertEqual(b'%02X' % DataGenerator.compute_checksum(msg[:-4]), msg[-4:-2])
+
+    def test_civil_days(self):
+        epoch = date(1970, 1, 1)
+        for days in (-719_162, -1, 0, 59, 365, 11_016, 18_262, 18_321, 2_932_896):
+            d = epoch + timedelta(days=days)
+            self.assertEqual((d.year, d.month, d.day), simdata.civil_from_days(days))
+            self.assertEqual(days, simdata.days_from_civil(d.year, d.month, d.day))
+
+        t = simdata.ComponentDateTime(0)
+        t.update(86_400_123_456)
+        self.assertEqual(datetime(2020, 1, 2, 0, 0, 0, 123_456), t.to_datetime())
+
+    def test_component_date_time_update(self):
+        # Updates move the time by the change in tick count, not by the absolute count
+        t = simdata.ComponentDateTime(5_000_000)
+        start = t.to_datetime()
+        t.update(5_250_000)
+        self.assertEqual(timedelta(microseconds=250_000), t.to_datetime() - start)
+        t.update(5_100_000)
+        self.assertEqual(timedelta(microseconds=100_000), t.to_datetime() - start)
 
     def test_format_angle(self):
         fa: FormattedAngle = format_angle(43.000003270800001)
@@ -43,6 +73,11 @@ class TestDataGenerator(unittest.TestCase):
         self.assertEqual(0.99999672920000648, fa.minutes)
         self.assertEqual(0, fa.hemisphere)
 
+        for angle in (43.000003270800001, -74.999996729200006, 0.0):
+            fa = format_angle(angle)
+            self.assertEqual((fa.degrees, fa.minutes, b'N' if fa.hemisphere == 1 else b'S'),
+                             simdata._gga_angle(angle, b'N', b'S'))
+
     def test_unit_normal(self):
         state: State = State()
 
@@ -58,6 +93,30 @@ class TestDataGenerator(unittest.TestCase):
         self.assertLess(-5.75, min(test_unit_normal))
         self.assertGreater(5.75, max(test_unit_normal))
 
+    @unittest.skipIf(simdata._compiled_normal() is None, 'numba is not available')
+    def test_unit_normal_compiled(self):
+        state: State = State()
+        state._n_normal = simdata.JIT_NORMAL_THRESHOLD
+
+        test_unit_normal = np.array([state.unit_normal() for _ in range(100_000)])
+
+        self.assertAlmostEqual(0.0, np.mean(test_unit_normal), 1)
+        self.assertAlmostEqual(1.0, np.std(test_unit_normal), 1)
+
+    def test_unit_normal_prefetch(self):
+        state: State = State()
+        state.prefetch(1000)
+
+        # Draw enough to refill each pool several times over
+        test_unit_normal = np.array([state.unit_normal() for _ in range(100_000)])
+        test_unit_uniform = np.array([state.unit_uniform() for _ in range(100_000)])
+
+        self.assertAlmostEqual(0.0, np.mean(test_unit_normal), 1)
+        self.assertAlmostEqual(1.0, np.std(test_unit_normal), 1)
+        self.assertAlmostEqual(0.5, np.mean(test_unit_uniform), 1)
+        self.assertLessEqual(0.0, min(test_unit_uniform))
+        self.assertGreater(1.0, max(test_unit_uniform))
+
     def __test_header_packets(self, buff: bytes):
         # First packet is SerialiserVersion
         # Packet ID for SerialiserVersion packet type is 0
@@ -101,6 +160,22 @@ class TestDataGenerator(unittest.TestCase):
         # Logger ID in bytes 58-71, equals 'WIBL-Simulator'
         self.assertEqual('WIBL-Simulator', struct.unpack('<14s', buff[59:73])[0].decode('UTF-8'))
 
+    def test_emit_batch(self):
+        state: State = State()
+        state.update_ticks(300536)
+        state.ref_time.update(state.curr_ticks)
+        state.sim_time.update(math.floor(state.curr_ticks / 2))
+        gen: DataGenerator = DataGenerator(emit_nmea0183=True, emit_nmea2000=True)
+
+        # Packets emitted in one batch are written exactly as they would be one at a time
+        batched: MemoryWriter = MemoryWriter('Gulf Surveyor', 'WIBL-Simulator')
+        gen.emit(state, batched, True, True, False)
+        single: MemoryWriter = MemoryWriter('Gulf Surveyor', 'WIBL-Simulator')
+        gen.emit_time(state, single)
+        gen.emit_position(state, single)
+
+        self.assertEqual(single.getvalue(), batched.getvalue())
+
     def test_generate_gga(self):
         state: State = State()
         # Simulate first position after initial position step
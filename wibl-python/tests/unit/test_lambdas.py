@@ -3,16 +3,22 @@ from pathlib import Path
 import os
 import tempfile
 import shutil
-from datetime import datetime
+from datetime import datetime, timezone
+import io
 import json
+import multiprocessing
+from unittest import mock
 
 from wibl import config_logger_service
 import wibl.core.config as conf
 from wibl.core import Lineage
 import wibl.core.timestamping as ts
-from wibl.core.datasource import LocalSource, LocalController
-from wibl.core.notification import LocalNotifier
-from wibl.processing.cloud.aws.lambda_function import process_item
+from wibl.core.datasource import LocalSource, LocalController, DataItem
+import wibl.core.datasource as ds
+import wibl.core.notification as nt
+from wibl.core.notification import LocalNotifier, BatchNotifier, Notifier, SNS_BATCH_SIZE
+from wibl.processing.cloud.aws.lambda_function import process_item, _process_safely
+import wibl.core.geojson_convert as gj
 from wibl.core.geojson_convert import FMT_OBS_TIME
 
 
@@ -47,6 +53,100 @@ class TestAlgorithms(unittest.TestCase):
     def tearDown(self) -> None:
         shutil.rmtree(self.tmp_dir)
 
+    def test_processing_unexpected_exception(self):
+        config = conf.read_config(Path(self.fixtures_dir, 'configure.local.json'))
+        wibl_file = str(Path(self.fixtures_dir, 'test-algo-dedup-nodata.wibl'))
+        source = LocalSource(wibl_file, os.path.join(self.tmp_dir, 'output.geojson'), config)
+
+        class FailingController(LocalController):
+            def obtain(self, item):
+                raise IOError('simulated transfer failure')
+
+        # Unexpected exceptions are logged and reported as None, rather than as a processing failure (False)
+        with self.assertLogs(logger, 'ERROR') as logs:
+            status = _process_safely(source.nextSource(), FailingController(config), LocalNotifier(''), config)
+        self.assertIsNone(status)
+        self.assertIn('simulated transfer failure', logs.output[0])
+
+    @unittest.skipUnless(hasattr(os, 'register_at_fork'), 'requires fork')
+    def test_clients_reset_in_child(self):
+        # Forked children mustn't inherit the parent's pooled S3/SNS connections
+        saved = ds._s3, nt._sns
+        ds._s3, nt._sns = object(), object()
+        try:
+            ctx = multiprocessing.get_context('fork')
+            recv_conn, send_conn = ctx.Pipe(duplex=False)
+            proc = ctx.Process(target=lambda: send_conn.send((ds._s3 is None, nt._sns is None)))
+            proc.start()
+            self.assertEqual((True, True), recv_conn.recv())
+            proc.join()
+        finally:
+            ds._s3, nt._sns = saved
+
+    @unittest.skipIf(ds.zstandard is None, 'requires zstandard')
+    def test_aws_controller_zstd(self):
+        wibl_file = Path(self.fixtures_dir, 'test-algo-dedup-nodata.wibl')
+        raw = wibl_file.read_bytes()
+        compressed = ds.zstandard.ZstdCompressor().compress(raw)
+
+        class StubClient:
+            def __init__(self):
+                self.uploads = []
+
+            def get_object(self, Bucket, Key):
+                return {'Body': io.BytesIO(compressed), 'ContentLength': len(compressed)}
+
+            def get_object_tagging(self, Bucket, Key):
+                return {'TagSet': [{'Key': 'SourceID', 'Value': 'SEAID-1'}]}
+
+            def upload_file(self, Filename, Bucket, Key, **kwargs):
+                with open(Filename, 'rb') as f:
+                    self.uploads.append((Bucket, Key, f.read()))
+
+            def copy_object(self, **kwargs):
+                raise AssertionError('compressed objects must be uploaded from the decompressed copy')
+
+        # Compressed objects are named locally (and at the destination) as if they weren't compressed
+        self.assertEqual(ds._local_and_dest_names('log/file.wibl'), ds._local_and_dest_names('log/file.wibl.zst'))
+        localname = os.path.join(self.tmp_dir, 'file.wibl')
+        item = DataItem('incoming', 'file.wibl.zst', len(compressed), localname, 'staging', 'file.json', 0)
+
+        client = StubClient()
+        with mock.patch.dict(os.environ, {'DEST_BUCKET': 'staging'}):
+            controller = ds.AWSController({'verbose': False}, client=client)
+        local_file, info = controller.obtain(item)
+        self.assertEqual(localname, local_file)
+        self.assertEqual('SEAID-1', info['sourceID'])
+        with open(local_file, 'rb') as f:
+            self.assertEqual(raw, f.read())
+
+        controller.copy(item, 'SEAID-1', 'logger', 10)
+        self.assertEqual([('staging', 'file.json', raw)], client.uploads)
+
+    def test_batch_notifier(self):
+        class RecordingNotifier(Notifier):
+            def __init__(self):
+                self.batches = []
+
+            def notify(self, item):
+                return None if item.dest_key == 'bad' else item.dest_key
+
+            def notify_batch(self, items):
+                self.batches.append(len(items))
+                return super().notify_batch(items)
+
+        target = RecordingNotifier()
+        notifier = BatchNotifier(target)
+        count = 2 * SNS_BATCH_SIZE + 3
+        for n in range(count):
+            notifier.notify(DataItem('in', f'{n}', 1, None, 'out', 'bad' if n == 1 else f'{n}', 1))
+        # Full batches are sent as they fill, so only the partial batch is left for flush()
+        self.assertEqual([SNS_BATCH_SIZE, SNS_BATCH_SIZE], target.batches)
+        failed = notifier.flush()
+        self.assertEqual([SNS_BATCH_SIZE, SNS_BATCH_SIZE, 3], target.batches)
+        self.assertEqual(['1'], [item.source_key for item in failed])
+        self.assertEqual([], notifier.flush())
+
     def test_processing_process_item(self):
         # Initialize
         config_file = Path(self.fixtures_dir, 'configure.local.json')
@@ -95,3 +195,55 @@ class TestAlgorithms(unittest.TestCase):
                                 msg=feat['properties']['depth'])
                 self.assertTrue(validate_obs_time_str(feat['properties']['time']),
                                 msg=feat['properties']['time'])
+
+    def test_format_obs_time(self):
+        # Pre-epoch times, and fractions that round up into the next second, must match datetime's formatting
+        for t in (0.0, 0.5, -0.5, -1e-7, -86400.9999996, 0.9999996, 1674481508.9999996, 1674481508.231):
+            expected = datetime.fromtimestamp(t, timezone.utc).strftime(FMT_OBS_TIME)
+            self.assertEqual(expected, gj.format_obs_time(t))
+        self.assertEqual('1969-12-31T23:59:59.500000Z', gj.format_obs_time(-0.5))
+        self.assertEqual('1970-01-01T00:00:01.000000Z', gj.format_obs_time(0.9999996))
+
+    def test_geojson_translate_stream(self):
+        config_file = Path(self.fixtures_dir, 'configure.local.json')
+        infile = str(Path(self.fixtures_dir, 'test-algo-dedup-nodata.wibl'))
+        config = conf.read_config(config_file)
+        os.environ['PROVIDER_ID'] = config['provider_id']
+
+        source_data = ts.time_interpolation(infile, Lineage(), config['elapsed_time_quantum'],
+                                            verbose=config['verbose'], fault_limit=config['fault_limit'],
+                                            process_algorithms=False)
+        expected = gj.translate(dict(source_data), Lineage(), infile, config)
+
+        # Streamed output should encode exactly the same GeoJSON as the complete structure
+        buffer = io.BytesIO()
+        header = gj.translate_stream(dict(source_data), Lineage(), infile, config, buffer)
+        self.assertEqual(expected, json.loads(buffer.getvalue()))
+        self.assertNotIn('features', header)
+        self.assertEqual(expected['properties'], header['properties'])
+
+    def test_processing_pass_through(self):
+        config_file = Path(self.fixtures_dir, 'configure.local.json')
+        wibl_file = str(Path(self.fixtures_dir, 'test-algo-dedup-nodata.wibl'))
+        config = conf.read_config(config_file)
+        os.environ['PROVIDER_ID'] = config['provider_id']
+        if 'management_url' in config:
+            os.environ['MANAGEMENT_URL'] = config['management_url']
+
+        # Make a GeoJSON file to use as input
+        source_data = ts.time_interpolation(wibl_file, Lineage(), config['elapsed_time_quantum'],
+                                            verbose=config['verbose'], fault_limit=config['fault_limit'],
+                                            process_algorithms=False)
+        infile = os.path.join(self.tmp_dir, 'input.geojson')
+        with open(infile, 'wb') as f:
+            gj.translate_stream(source_data, Lineage(), wibl_file, config, f)
+
+        # GeoJSON input should be passed through to the output unchanged
+        outfile = os.path.join(self.tmp_dir, 'output.geojson')
+        source = LocalSource(infile, outfile, config)
+        item = source.nextSource()
+        status = process_item(item, LocalController(config), LocalNotifier(''), config)
+        self.assertTrue(status)
+        with open(infile, 'rb') as f_in, open(outfile, 'rb') as f_out:
+            self.assertEqual(f_in.read(), f_out.read())
+        self.assertEqual(os.path.getsize(outfile), item.dest_size)
@@ -26,11 +26,14 @@
 # OR OTHER DEALINGS IN THE SOFTWARE.
 
 import os
+import threading
 from dataclasses import dataclass
 from dataclasses_json import dataclass_json
 from enum import Enum
-from typing import Tuple, List
+from typing import Tuple, List, Optional
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 
 __version__ = '1.0.0'
@@ -100,14 +103,48 @@ class MetadataType(Enum):
     GEOJSON_METADATA = 1
 
 
+# Sessions are held per thread: requests doesn't document Session as thread-safe, and the processing Lambda calls
+# ManagerInterface from a pool of worker threads.
+_sessions = threading.local()
+
+
+def _reset_sessions() -> None:
+    global _sessions
+    _sessions = threading.local()
+
+
+# A forked child mustn't share the parent's pooled connections, so it starts with fresh sessions.  (Forking isn't
+# available everywhere, e.g., on Windows.)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_sessions)
+
+
+def default_session() -> requests.Session:
+    """Return the calling thread's HTTP session used by ManagerInterface, creating it on first use.  Reusing the
+       session keeps the connection to the REST server alive between calls (and between files being processed),
+       rather than paying for a new TCP/TLS handshake on every request.
+    """
+    session = getattr(_sessions, 'session', None)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=Retry(total=2, backoff_factor=0.1))
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        _sessions.session = session
+    return session
+
+
 class ManagerInterface:
     metatype:   MetadataType
     logmsgs:    MessageStore
     verbose:    bool
     rest_url:   str
+    session:    requests.Session
 
-    def __init__(self, metatype: MetadataType, fileid: str, verbose: bool) -> None:
+    def __init__(self, metatype: MetadataType, fileid: str, verbose: bool,
+                 session: Optional[requests.Session] = None) -> None:
         self.metatype = metatype
+        self.session = session or default_session()
         self.verbose = verbose
         self.logmsgs = MessageStore()
         if metatype == MetadataType.WIBL_METADATA:
@@ -127,7 +164,7 @@ class ManagerInterface:
     def register(self, filesize: float) -> bool:
         if not self.rest_url:
             return True
-        response = requests.post(self.rest_url, json={'size': filesize})
+        response = self.session.post(self.rest_url, json={'size': filesize})
         if response.status_code != ReturnCodes.RECORD_CREATED.value:
             self.logmsg(f'error: metadata REST returned {response.status_code} for POST({self.rest_url}).')
             return False
@@ -142,9 +179,11 @@ class ManagerInterface:
         meta_json = meta.to_dict()
         if not self.logmsgs.empty():
             meta_json['messages'] = self.logmsgs.extract()
-        response = requests.put(self.rest_url, json=meta_json)
+        # PATCH creates the record if the initial registration didn't make it, so that the final state is
+        # always recorded, in a single round trip and commit.
+        response = self.session.patch(self.rest_url, json=meta_json)
         if response.status_code != ReturnCodes.RECORD_CREATED.value:
-            self.logmsgs.write(f'error: metadata REST returned {response.status_code} for PUT({self.rest_url}).', self.verbose)
+            self.logmsgs.write(f'error: metadata REST returned {response.status_code} for PATCH({self.rest_url}).', self.verbose)
             return False
         return True
 
@@ -157,7 +196,7 @@ class ManagerInterface:
         if not self.rest_url:
             return False, null_rtn
         
-        response = requests.get(self.rest_url)
+        response = self.session.get(self.rest_url)
         if response.status_code != ReturnCodes.OK.value:
             self.logmsgs.write(f'error: metadata GET returned {response.status_code} for GET({self.rest_url}).', self.verbose)
             return False, null_rtn
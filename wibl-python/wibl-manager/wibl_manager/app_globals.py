@@ -31,8 +31,23 @@ import os
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 
+try:
+    import redis
+except ImportError:
+    redis = None
+
 MANAGER_DATABASE_URI = os.environ.get('MANAGER_DATABASE_URI', 'sqlite:///database.db')
+# Optional Redis server used to cache metadata lookups; no caching is done if this isn't set
+MANAGER_CACHE_URL = os.environ.get('MANAGER_CACHE_URL')
 
 app = Flask('WIBL-Manager')
 app.config['SQLALCHEMY_DATABASE_URI'] = MANAGER_DATABASE_URI
 db = SQLAlchemy(app)
+
+if MANAGER_CACHE_URL and redis is not None:
+    cache = redis.Redis.from_url(MANAGER_CACHE_URL)
+else:
+    if MANAGER_CACHE_URL:
+        app.logger.warning('MANAGER_CACHE_URL is set, but the redis package is not installed; '
+                           'metadata lookups will not be cached.')
+    cache = None
@@ -1,9 +1,80 @@
+from typing import Optional
+
+from sqlalchemy import inspect, insert, text
+
 from wibl_manager.app_globals import app, db
 # Import data models even though we don't directly use them here
 # so that SQLAlchemy will be made aware of them before ``db.create_all()`` is called.
+from wibl_manager.file_data import FileModel, timestamp_ms
 from wibl_manager.wibl_data import WIBLData
 from wibl_manager.geojson_data import GeoJSONData
+from wibl_manager import MetadataType
+
+# Tables used for WIBL and GeoJSON metadata before they were merged into a single table
+LEGACY_WIBL_TABLE = 'wibl_data_model'
+LEGACY_GEOJSON_TABLE = 'geo_json_data_model'
+
+
+# Time columns, which the legacy tables held as ISO 8601 strings
+TIME_COLUMNS = ('processtime', 'uploadtime', 'updatetime', 'notifytime', 'starttime', 'endtime')
+
+
+def _legacy_time(value: Optional[str]) -> Optional[int]:
+    # Legacy times were stored verbatim from the client, so anything that isn't a valid time is dropped
+    try:
+        return timestamp_ms(value)
+    except ValueError:
+        return None
+
+
+def migrate_legacy_tables() -> int:
+    """
+    Copy any metadata held in the separate WIBL and GeoJSON tables used by earlier versions of the
+    manager into the unified file table, converting times from ISO 8601 strings into milliseconds
+    since the epoch.  The legacy tables are left in place so that the migration can be checked before
+    they are dropped manually; the migration is skipped if the unified table already has any records.
+
+    :return:    Number of records migrated
+    :rtype:     int
+    """
+    tables = inspect(db.engine).get_table_names()
+    if LEGACY_WIBL_TABLE not in tables or LEGACY_GEOJSON_TABLE not in tables:
+        return 0
+    if db.session.query(FileModel).first() is not None:
+        return 0
+    statement = text(
+        f'SELECT fileid, {MetadataType.WIBL_METADATA.value} AS kind, processtime, NULL AS uploadtime, updatetime, '
+        'notifytime, logger, platform, size, observations, soundings, starttime, endtime, status, messages '
+        f'FROM {LEGACY_WIBL_TABLE} '
+        'UNION ALL '
+        f'SELECT fileid, {MetadataType.GEOJSON_METADATA.value}, NULL, uploadtime, updatetime, notifytime, logger, '
+        f'NULL, size, NULL, soundings, NULL, NULL, status, messages FROM {LEGACY_GEOJSON_TABLE}'
+    )
+    records = []
+    for row in db.session.execute(statement).mappings():
+        record = dict(row)
+        for column in TIME_COLUMNS:
+            record[column] = _legacy_time(record[column])
+        records.append(record)
+    if records:
+        db.session.execute(insert(FileModel), records)
+    db.session.commit()
+    return len(records)
+
+
+def create_indices() -> None:
+    """
+    Add any indices on the file table that are missing, which happens when the table was created by an
+    earlier version of the manager (``db.create_all()`` doesn't modify existing tables).
+    """
+    for index in FileModel.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+
 
 if __name__ == "__main__":
     with app.app_context():
         db.create_all()
+        create_indices()
+        n_migrated = migrate_legacy_tables()
+        if n_migrated > 0:
+            print(f'Migrated {n_migrated} records from legacy tables.')
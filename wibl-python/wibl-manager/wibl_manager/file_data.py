@@ -0,0 +1,496 @@
+# Unified file metadata model and RESTful endpoint base class.
+#
+# Both the WIBL files being processed and the GeoJSON files being uploaded to the archive
+# share most of their metadata (size, logger, soundings, status, timestamps, etc.), so they
+# are held in a single table with a 'kind' discriminator column, rather than in two tables
+# that duplicate each other.  The REST endpoints for each kind of file are thin sub-classes
+# of the common resource here, configured for the metadata that they expose to the user.
+#
+# Copyright 2023 Center for Coastal and Ocean Mapping & NOAA-UNH Joint
+# Hydrographic Center, University of New Hampshire.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+import re
+import time
+from datetime import datetime, timezone
+from operator import attrgetter
+from typing import Dict, Any, Callable, Tuple, Optional, NamedTuple, Sequence
+
+from flask import abort, make_response, request
+from flask_restful import Resource, fields
+import flask_restful
+from sqlalchemy import select
+import orjson
+
+from wibl_manager.app_globals import db, cache, redis
+from wibl_manager import ReturnCodes, MetadataType
+
+
+# Maximum length of the messages stored with the metadata
+MAX_MESSAGES_LENGTH = 1024
+# Lifetime (seconds) of cached metadata lookups, as a backstop to invalidation on write
+CACHE_TIMEOUT = 3600
+# Lifetime (seconds) of the generation counters that version the cache keys; this must be longer than
+# CACHE_TIMEOUT, so that a counter can't expire (and restart) while entries cached under it are still live
+CACHE_GENERATION_TIMEOUT = 2 * CACHE_TIMEOUT
+
+
+# Value reported for times that haven't been set
+UNKNOWN_TIME = 'Unknown'
+
+
+def _now_ms() -> int:
+    # Current time as milliseconds since the epoch, the form in which times are stored
+    return time.time_ns() // 1_000_000
+
+
+# Fractional seconds in an ISO 8601 time, which datetime.fromisoformat() only accepts with exactly three or six
+# digits before Python 3.11
+_FRACTIONAL_SECONDS = re.compile(r'(?<=:\d\d)[.,](\d+)')
+
+
+def _microsecond_fraction(match: re.Match) -> str:
+    return '.' + match.group(1)[:6].ljust(6, '0')
+
+
+def timestamp_ms(value: Optional[str]) -> Optional[int]:
+    """
+    Convert an ISO 8601 time string (as provided in requests) into milliseconds since the epoch, the form
+    in which times are stored.  Times without a timezone are assumed to be UTC, and fractional seconds may have
+    any number of digits (beyond microseconds, they are truncated).  This can be used as an argument type (see
+    :class: `Argument`), so that an invalid time is reported as a bad request.
+
+    :param value:   ISO 8601 time string, or UNKNOWN_TIME if the time isn't known
+    :type value:    str, optional
+    :return:        Milliseconds since the epoch, or None if the time isn't known
+    :rtype:         int, optional
+    :raises:        ValueError if the string isn't a valid ISO 8601 time
+    """
+    if value is None or value == UNKNOWN_TIME:
+        return None
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    t = datetime.fromisoformat(_FRACTIONAL_SECONDS.sub(_microsecond_fraction, value, count=1))
+    if t.tzinfo is None:
+        t = t.replace(tzinfo=timezone.utc)
+    return round(t.timestamp() * 1000)
+
+
+def _as_iso_time(value: Optional[int]) -> str:
+    return UNKNOWN_TIME if value is None else datetime.fromtimestamp(value / 1000, timezone.utc).isoformat()
+
+
+class Timestamp(fields.Raw):
+    """
+    Marshalling field for times stored as milliseconds since the epoch, which are reported as ISO 8601
+    strings (or UNKNOWN_TIME if not set).
+    """
+    def format(self, value: Optional[int]) -> str:
+        return _as_iso_time(value)
+
+
+def _as_str(value: Any) -> Any:
+    return None if value is None else str(value)
+
+
+def _as_float(value: Any) -> Any:
+    return None if value is None else float(value)
+
+
+def _as_int(value: Any) -> int:
+    # As for flask_restful.fields.Integer, a missing value is reported as zero
+    return 0 if value is None else int(value)
+
+
+_FIELD_CONVERTERS = {
+    fields.String: _as_str,
+    fields.Float: _as_float,
+    fields.Integer: _as_int,
+    Timestamp: _as_iso_time
+}
+
+
+def compile_marshaller(resource_fields: Dict[str, Any]) -> Callable[[Any], Dict[str, Any]]:
+    """
+    Precompile a marshalling specification (as used by flask_restful.marshal) into a function that converts a
+    database record into a dictionary ready for JSON serialisation.  All of the attributes are read with a single
+    attribute getter, and converted by type, so that the specification does not have to be walked for each
+    response.
+
+    :param resource_fields: Dictionary of output name to flask_restful field type
+    :type resource_fields:  Dict[str, Any]
+    :return:                Function to convert a record into a dictionary
+    :rtype:                 Callable[[Any], Dict[str, Any]]
+    """
+    keys = tuple(resource_fields.keys())
+    try:
+        converters = tuple(_FIELD_CONVERTERS[resource_fields[k]] for k in keys)
+    except KeyError as e:
+        raise ValueError(f'unsupported field type {e} in marshalling specification.')
+    getter = attrgetter(*keys)
+    if len(keys) == 1:
+        single = getter
+        getter = lambda record: (single(record),)
+    plan = tuple(zip(keys, converters))
+
+    def marshaller(record: Any) -> Dict[str, Any]:
+        values = getter(record)
+        return {key: convert(value) for (key, convert), value in zip(plan, values)}
+
+    return marshaller
+
+
+class Argument(NamedTuple):
+    """
+    Specification for a single argument accepted by an end-point: the name in the request, a function that converts
+    the value provided (raising ValueError or TypeError if it's invalid), a description of the argument for error
+    reports, and whether the argument must be provided.
+    """
+    name: str
+    type: Callable[[Any], Any]
+    help: str
+    required: bool = False
+
+
+def compile_parser(arguments: Sequence[Argument]) -> Callable[[], Dict[str, Any]]:
+    """
+    Precompile a set of argument specifications into a function that extracts them from the current request.  The
+    arguments are read from the JSON body if there is one, or otherwise from the form/query values, in the same way
+    as the flask_restful.reqparse parser that this replaces (and with the same form of error report), but without
+    re-walking the argument descriptors and request sources for every argument on each request.  Only arguments that
+    are provided (and not null) appear in the output.
+
+    :param arguments:   Specifications for the arguments accepted
+    :type arguments:    Sequence[Argument]
+    :return:            Function to parse the current request into a dictionary of argument name to value
+    :rtype:             Callable[[], Dict[str, Any]]
+    """
+    plan = tuple(arguments)
+
+    def parser() -> Dict[str, Any]:
+        source = request.get_json(silent=True)
+        if not isinstance(source, dict):
+            source = request.values
+        args = {}
+        for arg in plan:
+            value = source.get(arg.name)
+            if value is None:
+                if arg.required:
+                    flask_restful.abort(ReturnCodes.FAILED.value,
+                                        message={arg.name: f'{arg.help} Missing required parameter.'})
+                continue
+            try:
+                value = arg.type(value)
+            except (ValueError, TypeError):
+                flask_restful.abort(ReturnCodes.FAILED.value, message={arg.name: arg.help})
+            if value is not None:
+                args[arg.name] = value
+        return args
+
+    return parser
+
+
+class FileModel(db.Model):
+    """
+    Data model for file metadata (both WIBL and GeoJSON) during processing and upload, held in a suitable
+    database (controlled externally).  Elements that are only relevant to one kind of file are left as NULL
+    for the other kind.
+
+    Attributes:
+    :param fileid:          Primary key (with kind), usually the file's name (assuming that it's a UUID)
+    :type fileid:           str
+    :param kind:            Primary key (with fileid), the type of file being described
+    :type kind:             :enum: `MetadataType`
+    :param processtime:     Time (milliseconds since the epoch) when a WIBL file was first picked up for processing.
+    :type processtime:      int, optional
+    :param uploadtime:      Time (milliseconds since the epoch) when a GeoJSON file was first picked up for upload.
+    :type uploadtime:       int, optional
+    :param updatetime:      Time (milliseconds since the epoch) when the PUT update to the metadata is received.
+    :type updatetime:       int, optional
+    :param notifytime:      Time (milliseconds since the epoch) when a notification about any failure is sent out.
+    :type notifytime:       int, optional
+    :param logger:          Unique identifier used for the logger generating the data.
+    :type logger:           str, optional
+    :param platform:        Name of the platform being used to host the logger (WIBL files only).
+    :type platform:         str, optional
+    :param size:            Size of the file in MB.
+    :type size:             float
+    :param observations:    Number of raw observations of depth in the file (WIBL files only).
+    :type observations:     int, optional
+    :param soundings:       Number of processed (output) soundings in the converted file.
+    :type soundings:        int, optional
+    :param starttime:       Time (milliseconds since the epoch) of the earliest output sounding (WIBL files only).
+    :type starttime:        int, optional
+    :param endtime:         Time (milliseconds since the epoch) of the latest output sounding (WIBL files only).
+    :type endtime:          int, optional
+    :param status:          Status indicator for processing or upload of the file, depending on kind.
+    :type status:           int, optional
+    :param messages:        Messages returned during processing (usually error/warnings)
+    :type messages:         str, optional
+    """
+    __tablename__ = 'file'
+    # Indices for monitoring scans (e.g., files still in a given status since before some time) that would
+    # otherwise need a full table scan; the creation time for each kind is NULL for the other kind.
+    __table_args__ = (
+        db.Index('ix_file_status_processtime', 'status', 'processtime'),
+        db.Index('ix_file_status_uploadtime', 'status', 'uploadtime')
+    )
+
+    fileid = db.Column(db.String(40), primary_key=True)
+    kind = db.Column(db.SmallInteger, primary_key=True, index=True)
+    processtime = db.Column(db.BigInteger)
+    uploadtime = db.Column(db.BigInteger)
+    updatetime = db.Column(db.BigInteger)
+    notifytime = db.Column(db.BigInteger)
+    logger = db.Column(db.String(80))
+    platform = db.Column(db.String(80))
+    size = db.Column(db.Float, nullable=False)
+    observations = db.Column(db.Integer)
+    soundings = db.Column(db.Integer)
+    starttime = db.Column(db.BigInteger)
+    endtime = db.Column(db.BigInteger)
+    status = db.Column(db.Integer)
+    messages = db.Column(db.String(MAX_MESSAGES_LENGTH))
+
+    def __repr__(self):
+        """
+        Generate a simple string representation of the data model for debugging purposes.
+        """
+        return f'file {self.fileid} (kind {self.kind}) for logger {self.logger} size {self.size} MB, status={self.status}.'
+
+
+class FileData(Resource):
+    """
+    Common RESTful end-point for manipulating file metadata in the database.  The design here assumes
+    that the user will use POST to generate an initial metadata entry when the file is first picked up,
+    and then update it with PUT when the results are known; PATCH does both in a single transaction, creating the
+    entry if required.  GET is provided for metadata lookup (GET 'all' for everything of the same kind) and DELETE
+    for file removal.  Sub-classes configure which kind
+    of file they manipulate, and which metadata elements are exposed.
+    """
+    # Kind of file manipulated by the end-point
+    kind: MetadataType
+    # Human-readable name for the kind of file, for error messages
+    label: str
+    # Marshalling specification for the metadata returned to the user, its compiled form, and the
+    # database columns that it reads
+    resource_fields: Dict[str, Any]
+    marshaller: Callable[[Any], Dict[str, Any]]
+    resource_columns: Tuple[Any, ...]
+    # Argument parsers for POST (creation) and PUT (update), compiled by :func: `compile_parser`
+    create_args: Callable[[], Dict[str, Any]]
+    update_args: Callable[[], Dict[str, Any]]
+    # Mapping from PUT argument names to the database columns that they update
+    update_fields: Tuple[Tuple[str, str], ...]
+    # Database column set to the current time on creation
+    create_time_column: str
+    # Initial values for the metadata on creation
+    create_defaults: Dict[str, Any]
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if 'resource_fields' in cls.__dict__:
+            cls.marshaller = staticmethod(compile_marshaller(cls.resource_fields))
+            cls.resource_columns = tuple(getattr(FileModel, k) for k in cls.resource_fields)
+        # Compiled parsers are plain functions, which shouldn't be bound to the instance
+        for name in ('create_args', 'update_args'):
+            if name in cls.__dict__:
+                setattr(cls, name, staticmethod(cls.__dict__[name]))
+
+    def _generation_key(self, fileid: str) -> str:
+        return f'file:{self.kind.value}:{fileid}:gen'
+
+    def _cache_key(self, fileid: str, generation: Optional[bytes]) -> str:
+        # Cached lookups are keyed by the generation of the file's metadata when they were read, so that a lookup
+        # that raced with a write (reading the record before the write, but caching it after) stores its result
+        # under a generation that's already out of date, where it's never read.
+        return f'file:{self.kind.value}:{fileid}:{int(generation or 0)}'
+
+    def _cache_invalidate(self, fileid: str) -> None:
+        # Move on the generation for the file (and for the list of all files), so that cached lookups made stale by
+        # a write are no longer read; the cache is only an accelerator, so any problem talking to it is ignored.
+        if cache is None:
+            return
+        try:
+            pipe = cache.pipeline(transaction=False)
+            for key in (self._generation_key(fileid), self._generation_key('all')):
+                pipe.incr(key)
+                pipe.expire(key, CACHE_GENERATION_TIMEOUT)
+            pipe.execute()
+        except redis.RedisError:
+            pass
+
+    def _lookup(self, fileid: str) -> FileModel:
+        # Primary-key lookup, which can be served from the session's identity map without a query
+        return db.session.get(FileModel, (fileid, self.kind.value))
+
+    def _create(self, fileid: str, size: float) -> FileModel:
+        # New record with the creation defaults, added to (but not committed in) the current transaction
+        record = FileModel(fileid=fileid, kind=self.kind.value, size=size, **self.create_defaults)
+        setattr(record, self.create_time_column, _now_ms())
+        db.session.add(record)
+        return record
+
+    def apply_update(self, record: FileModel, args: Dict[str, Any]) -> None:
+        """
+        Transfer the user-supplied metadata from a PUT request into the database record.  Only those arguments
+        that are provided are updated, so that legitimate zero values (e.g., a status of zero) can still be set.
+
+        :param record:  Database record to update
+        :type record:   FileModel
+        :param args:    Parsed arguments from the request
+        :type args:     Dict[str, Any]
+        """
+        for arg_key, column in self.update_fields:
+            value = args.get(arg_key)
+            if value is not None:
+                setattr(record, column, value)
+        if record.messages is not None and len(record.messages) > MAX_MESSAGES_LENGTH:
+            record.messages = record.messages[:MAX_MESSAGES_LENGTH]
+
+    def get(self, fileid):
+        """
+        Lookup for a single file's metadata, or all files of the same kind if :param: `fileid` is "all".
+
+        :param fileid:  Filename to look up (typically a UUID)
+        :type fileid:   str
+        :return:        Metadata instance for the file or list of all files, or NOT_FOUND if the record doesn't exist
+        :rtype:         dict    Marshalled into JSON-serialisable form.
+        """
+        cache_key = None
+        if cache is not None:
+            try:
+                cache_key = self._cache_key(fileid, cache.get(self._generation_key(fileid)))
+                blob = cache.get(cache_key)
+            except redis.RedisError:
+                blob = None
+            if blob is not None:
+                # Cached in serialised form, so it can be returned without marshalling or encoding
+                response = make_response(blob)
+                response.mimetype = 'application/json'
+                return response
+        if fileid == 'all':
+            # Read-only bulk fetch: project just the columns being returned, rather than constructing
+            # a full mapped instance (and identity map entry) for each record.
+            result = db.session.execute(
+                select(*self.resource_columns).where(FileModel.kind == self.kind.value)).all()
+        else:
+            result = self._lookup(fileid)
+        if not result:
+            abort(ReturnCodes.FILE_NOT_FOUND.value, description=f'That {self.label} file does not exist.')
+        if isinstance(result, list):
+            data = [self.marshaller(r) for r in result]
+        else:
+            data = self.marshaller(result)
+        if cache_key is not None:
+            try:
+                cache.set(cache_key, orjson.dumps(data), ex=CACHE_TIMEOUT)
+            except redis.RedisError:
+                pass
+        return data
+
+    def post(self, fileid):
+        """
+        Initial creation of a metadata entry for a file.  Only the 'size' parameter is required at creation
+        time; the server automatically sets the creation time element to the current time and defaults the
+        other values in the metadata to "unknown" states that are recognisable.
+
+        :param fileid:  Filename to look up (typically a UUID)
+        :type fileid:   str
+        :return:        The initial state of the metadata for the file and RECORD_CREATED, or RECORD_CONFLICT if
+                        the record already exists.
+        :rtype:         tuple   Marshalled into JSON-serialisable form.
+        """
+        args = self.create_args()
+        with db.session.begin():
+            if self._lookup(fileid):
+                abort(ReturnCodes.RECORD_CONFLICT.value,
+                      description=f'That {self.label} file already exists in the database; use PUT to update.')
+            record = self._create(fileid, args['size'])
+        self._cache_invalidate(fileid)
+        return self.marshaller(record), ReturnCodes.RECORD_CREATED.value
+
+    def put(self, fileid):
+        """
+        Update of the metadata for a single file.  All variables can be set through the data parameters in the
+        request, although the server automatically sets the 'updatetime' component to the current UTC time for
+        the call.  All of the metadata elements are optional.
+
+        :param fileid:  Filename to look up (typically a UUID)
+        :type fileid:   str
+        :return:        The updated state of the metadata for the file and RECORD_CREATED, or NOT_FOUND if the
+                        record doesn't exist.
+        :rtype:         tuple   Marshalled into JSON-serialisable form.
+        """
+        args = self.update_args()
+        with db.session.begin():
+            record = self._lookup(fileid)
+            if not record:
+                abort(ReturnCodes.FILE_NOT_FOUND.value,
+                      description=f'That {self.label} file does not exist in database; use POST to add.')
+            record.updatetime = _now_ms()
+            self.apply_update(record, args)
+        self._cache_invalidate(fileid)
+        return self.marshaller(record), ReturnCodes.RECORD_CREATED.value
+
+    def patch(self, fileid):
+        """
+        Create-or-update of the metadata for a single file in one transaction.  If the record doesn't exist,
+        it is created as for POST (in which case 'size' is required), and then the update is applied as for
+        PUT.  This allows a client that would otherwise POST and then immediately PUT to do so in a single
+        round trip and database commit.
+
+        :param fileid:  Filename to look up (typically a UUID)
+        :type fileid:   str
+        :return:        The updated state of the metadata for the file and RECORD_CREATED, or FAILED if the
+                        record doesn't exist and no 'size' is provided.
+        :rtype:         tuple   Marshalled into JSON-serialisable form.
+        """
+        args = self.update_args()
+        with db.session.begin():
+            record = self._lookup(fileid)
+            if not record:
+                if args.get('size') is None:
+                    abort(ReturnCodes.FAILED.value,
+                          description=f'That {self.label} file does not exist in database, and size is required to add it.')
+                record = self._create(fileid, args['size'])
+            record.updatetime = _now_ms()
+            self.apply_update(record, args)
+        self._cache_invalidate(fileid)
+        return self.marshaller(record), ReturnCodes.RECORD_CREATED.value
+
+    def delete(self, fileid):
+        """
+        Remove a metadata record from the database for a single file.
+
+        :param fileid:  Filename to look up (typically a UUID)
+        :type fileid:   str
+        :return:        RECORD_DELETED or NOT_FOUND if the record doesn't exist.
+        :rtype:         int
+        """
+        with db.session.begin():
+            record = self._lookup(fileid)
+            if not record:
+                abort(ReturnCodes.FILE_NOT_FOUND.value,
+                      description=f'That {self.label} file does not exist in the database, and therefore cannot be deleted.')
+            db.session.delete(record)
+        self._cache_invalidate(fileid)
+        return ReturnCodes.RECORD_DELETED.value
@@ -71,6 +71,13 @@ class TestWiblManager(unittest.TestCase):
         self.assertIsNotNone(response)
         self.assertEqual(ReturnCodes.RECORD_CREATED.value, response.status_code)
         self.assertEqual('foo\nbar\nbaz', response.json()['messages'])
+        self.assertEqual('2023-01-23T13:45:08.231000+00:00', response.json()['starttime'])
+        self.assertEqual('Unknown', response.json()['endtime'])
+
+        # Fractional seconds needn't have exactly three or six digits
+        response = requests.patch(self.base_uri + 'wibl/' + self.filename, json={'endTime': '2023-01-23T14:00:00.5Z'})
+        self.assertEqual(ReturnCodes.RECORD_CREATED.value, response.status_code)
+        self.assertEqual('2023-01-23T14:00:00.500000+00:00', response.json()['endtime'])
 
         response = requests.delete(self.base_uri + 'wibl/' + self.filename)
         self.assertIsNotNone(response)
@@ -93,6 +100,28 @@ class TestWiblManager(unittest.TestCase):
         self.assertIsNotNone(response)
         self.assertEqual(ReturnCodes.OK.value, response.status_code)
 
+    def test_ddd_upsert(self):
+        response = requests.patch(self.base_uri + 'wibl/' + self.filename, json={'logger': 'UNHJHC-wibl-1'})
+        self.assertIsNotNone(response)
+        self.assertEqual(ReturnCodes.FAILED.value, response.status_code)
+
+        response = requests.patch(self.base_uri + 'wibl/' + self.filename,
+                                  json={'size': 10.4, 'logger': 'UNHJHC-wibl-1', 'status': 1})
+        self.assertIsNotNone(response)
+        self.assertEqual(ReturnCodes.RECORD_CREATED.value, response.status_code)
+        self.assertEqual('UNHJHC-wibl-1', response.json()['logger'])
+        self.assertEqual(1, response.json()['status'])
+
+        response = requests.patch(self.base_uri + 'wibl/' + self.filename, json={'soundings': 8020})
+        self.assertIsNotNone(response)
+        self.assertEqual(ReturnCodes.RECORD_CREATED.value, response.status_code)
+        self.assertEqual(10.4, response.json()['size'])
+        self.assertEqual(8020, response.json()['soundings'])
+
+        response = requests.delete(self.base_uri + 'wibl/' + self.filename)
+        self.assertIsNotNone(response)
+        self.assertEqual(ReturnCodes.OK.value, response.status_code)
+
 
 if __name__ == '__main__':
     unittest.main(
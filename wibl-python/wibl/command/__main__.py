@@ -28,7 +28,6 @@ import argparse
 
 from wibl import __version__ as version
 from wibl.command.edit_wibl_file import editwibl
-from wibl.command.datasim import datasim
 from wibl.command.upload_wibl_file import uploadwibl
 from wibl.command.parse_wibl_file import parsewibl
 from wibl.command.dcdb_upload import dcdb_upload
@@ -66,6 +65,8 @@ class WIBL:
         getattr(self, args.command)()
 
     def datasim(self):
+        # The simulator isn't included in the Lambda deployment packages, so it's only imported when used
+        from wibl.command.datasim import datasim
         datasim()
 
     def editwibl(self):
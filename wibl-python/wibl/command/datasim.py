@@ -81,7 +81,8 @@ def datasim():
                                        duplicate_depth_prob=args.duplicate_depth_prob,
                                        no_data_prob=args.no_data_prob)
     writer: Writer = FileWriter(args.filename, 'Gulf Surveyor', 'WIBL-Simulator')
-    engine: Engine = Engine(gen)
+    # Generate the random variates for the simulation in batches, rather than one at a time
+    engine: Engine = Engine(gen, prefetch=4096)
 
     first_time: int
     current_time: int
@@ -32,6 +32,7 @@ import argparse as arg
 import sys
 import os
 
+from wibl import config_logger_service
 from wibl.command import get_subcommand_prog
 import wibl.core.config as conf
 from wibl.processing.cloud.aws import get_config_file
@@ -69,6 +70,11 @@ def wibl_proc():
     if 'management_url' in config:
         os.environ['MANAGEMENT_URL'] = config['management_url']
 
+    # Progress messages from processing are logged at INFO, so report them when the configuration asks for verbose
+    # output (as the Lambda does).
+    if config['verbose']:
+        config_logger_service()
+
     source = LocalSource(infilename, outfilename, config)
     data_item = source.nextSource()
     controller = LocalController(config)
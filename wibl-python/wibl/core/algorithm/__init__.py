@@ -32,7 +32,7 @@ from dataclasses import dataclass
 from enum import Flag, auto
 
 from abc import ABC
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable
 
 from wibl import __version__ as wiblversion
 from wibl.core import Lineage
@@ -62,6 +62,26 @@ class AlgorithmPhase(Flag):
 class WiblAlgorithm(ABC):
     name: str
     phases: AlgorithmPhase
+    # Run method for each single phase in which the algorithm applies; filled in for each sub-class, so that
+    # selecting the method for a phase (and checking that it applies) is a single lookup.
+    handlers: Dict[AlgorithmPhase, Callable[[Any, str, Lineage, bool], Any]] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        candidates = {
+            AlgorithmPhase.ON_LOAD: cls.run_on_load,
+            AlgorithmPhase.AFTER_TIME_INTERP: cls.run_after_time_interp,
+            AlgorithmPhase.AFTER_GEOJSON_CONVERSION: cls.run_after_geojson_conversion
+        }
+        phases = getattr(cls, 'phases', AlgorithmPhase(0))
+        cls.handlers = {phase: handler for phase, handler in candidates.items() if phases & phase}
+
+    @classmethod
+    def run(cls, phase: AlgorithmPhase, data: Any, params: str, lineage: Lineage, verbose: bool) -> Any:
+        handler = cls.handlers.get(phase)
+        if handler is None:
+            raise ValueError(f"Algorithm '{cls.name}' does not apply in phase {phase}.")
+        return handler(data, params, lineage, verbose)
 
     @classmethod
     def run_on_load(cls,
@@ -40,33 +40,73 @@ __version__ = '1.0.0'
 
 ALG_NAME = 'deduplicate'
 
+# Number of depths above which the compiled scan (if numba is available) is used in preference
+# to the vectorised NumPy comparison.  The first call pays the JIT compilation cost (unless there's
+# a writable cache), so this is only worthwhile for very large files.
+JIT_SCAN_THRESHOLD = 1 << 20
+
+
+def _scan_depths(z: np.ndarray, out: np.ndarray) -> int:
+    # Single pass over the depths, recording the index of each one that differs from the last
+    # one kept; returns the number of indices written into ``out``.
+    k = 0
+    current_depth = 0.0
+    for n in range(z.shape[0]):
+        if z[n] != current_depth:
+            out[k] = n
+            k += 1
+            current_depth = z[n]
+    return k
+
+
+# Compiled version of _scan_depths(), or False if it can't be compiled; numba is only imported (which takes
+# longer than importing everything else the Lambdas need) the first time that a file is large enough to need it.
+_scan = None
+
+
+def _compiled_scan():
+    global _scan
+    if _scan is None:
+        try:
+            from numba import njit
+            _scan = njit(cache=True, boundscheck=False)(_scan_depths)
+        except (ImportError, RuntimeError):
+            # RuntimeError is raised if there's nowhere to cache the compiled code (e.g., read-only install)
+            _scan = False
+    return _scan or None
+
 
 def find_duplicates(source: Dict, verbose: bool) -> np.ndarray:
-    current_depth = 0
-    d = []
-    for n in range(len(source['depth']['z'])):
-        if source['depth']['z'][n] != current_depth:
-            d.append(n)
-            current_depth = source['depth']['z'][n]
-    rtn = np.array(d)
+    # A depth is kept if it differs from the one immediately before it (the first depth is compared
+    # against zero), which is the same as comparing against the last depth kept.
+    z = np.asarray(source['depth']['z'])
+    n_ip_points = z.shape[0]
+    scan = _compiled_scan() if n_ip_points >= JIT_SCAN_THRESHOLD else None
+    if scan is not None:
+        out = np.empty(n_ip_points, dtype=np.int64)
+        rtn = out[:scan(np.ascontiguousarray(z, dtype=np.float64), out)]
+    else:
+        mask = np.empty(n_ip_points, dtype=bool)
+        if n_ip_points > 0:
+            mask[0] = z[0] != 0
+            np.not_equal(z[1:], z[:-1], out=mask[1:])
+        rtn = np.flatnonzero(mask)
     if verbose:
-        n_ip_points = len(source['depth']['z'])
         n_op_points = len(rtn)
         print(f'After deduplication, total {n_op_points} points selected from {n_ip_points}')
     return rtn
 
 
 def deduplicate_depth(source: Dict[str,Any], params: str,  lineage: Lineage, verbose: bool) -> Dict[str,Any]:
-    n_ip_points = len(source['depth']['z'])
+    depth = source['depth']
+    n_ip_points = len(depth['z'])
     index = find_duplicates(source, verbose)
-    source['depth']['t'] = source['depth']['t'][index]
-    source['depth']['lat'] = source['depth']['lat'][index]
-    source['depth']['lon'] = source['depth']['lon'][index]
-    source['depth']['z'] = source['depth']['z'][index]
+    for key in ('t', 'lat', 'lon', 'z'):
+        depth[key] = depth[key][index]
     
     # To memorialise that we did something, we add an entry to the lineage segment of
     # the metadata headers in the data.
-    n_op_points = len(source['depth']['z'])
+    n_op_points = len(index)
     lineage.add_algorithm_element(name=ALG_NAME, parameters=params, source=SOURCE, version=__version__,
                                   comment=f'Selected {n_op_points} non-duplicate depths from {n_ip_points} in input.')
 
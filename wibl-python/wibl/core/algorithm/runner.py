@@ -13,19 +13,6 @@ ALGORITHMS = {
 }
 
 
-def _get_run_func_for_phase(algorithm: WiblAlgorithm, phase: AlgorithmPhase) -> \
-        Callable[
-            [Union[List[DataPacket], Dict[str, Any]], str, Lineage, bool],
-            Union[List[DataPacket], Dict[str, Any]]
-        ]:
-    if phase is AlgorithmPhase.ON_LOAD:
-        return algorithm.run_on_load
-    elif phase is AlgorithmPhase.AFTER_TIME_INTERP:
-        return algorithm.run_after_time_interp
-    elif phase is AlgorithmPhase.AFTER_GEOJSON_CONVERSION:
-        return algorithm.run_after_geojson_conversion
-
-
 def iterate(algorithm_descriptors: List[AlgorithmDescriptor],
             phase: AlgorithmPhase,
             wibl_file_name: str) -> \
@@ -57,12 +44,12 @@ def iterate(algorithm_descriptors: List[AlgorithmDescriptor],
     """
     for alg_desc in algorithm_descriptors:
         alg_name = alg_desc.name
-        if alg_name in ALGORITHMS:
-            alg: WiblAlgorithm = ALGORITHMS[alg_name]
-            if phase in alg.phases:
-                yield _get_run_func_for_phase(alg, phase), alg.name, alg_desc.params
-        else:
+        alg: WiblAlgorithm = ALGORITHMS.get(alg_name)
+        if alg is None:
             raise UnknownAlgorithm(f"Unknown algorithm '{alg_name}' for {wibl_file_name}.")
+        run_func = alg.handlers.get(phase)
+        if run_func is not None:
+            yield run_func, alg.name, alg_desc.params
 
 
 def run_algorithms(data: Union[List[DataPacket], Dict[str, Any]],
@@ -122,3 +122,20 @@ def read_config(config_file: Union[Path, str] = None) -> Dict[str, Any]:
 
     except Exception as e:
         raise BadConfiguration(e)
+
+
+# Configurations already read, keyed by file name
+_config_cache: Dict[str, Dict[str, Any]] = {}
+
+
+def read_config_cached(config_file: Union[Path, str]) -> Dict[str, Any]:
+    """As read_config(), but the configuration for each file is only read once per process, and the same dictionary
+       returned thereafter.  AWS Lambda reuses the process between invocations, so this avoids re-reading and parsing
+       the file on every warm invocation.  A configuration that fails to load isn't cached.
+    """
+    key = str(config_file)
+    config = _config_cache.get(key)
+    if config is None:
+        config = read_config(config_file)
+        _config_cache[key] = config
+    return config
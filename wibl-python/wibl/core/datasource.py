@@ -45,17 +45,65 @@
 
 from dataclasses import dataclass
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Tuple, Optional, List
+from typing import Dict, Any, Tuple, Optional, List, Union, BinaryIO
 from urllib.parse import unquote_plus, urlencode
+import io
 import json
 import os
+import shutil
 
 import boto3
 import botocore
+from botocore.config import Config
+from boto3.s3.transfer import TransferConfig
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 from wibl.core import getenv
 
-s3 = boto3.resource('s3')
+# Shared S3 interface, configured with a connection pool large enough for concurrent transfers (each of which
+# can use several connections for multi-part downloads/uploads) so that connections are reused rather than
+# discarded and re-negotiated, and with adaptive retries to ride out throttling.
+S3_CONFIG = Config(max_pool_connections=50, retries={'max_attempts': 3, 'mode': 'adaptive'})
+_s3 = None
+
+
+## Provide the shared low-level S3 client, constructing it on first use
+#
+# The client is built when it's first needed (rather than when the module is imported), so that importing the module
+# doesn't pay for the credential lookup and service model loading unless S3 is actually used.
+#
+# \return boto3 S3 client, shared by all users in the process
+def s3_client():
+    global _s3
+    if _s3 is None:
+        _s3 = boto3.client('s3', config=S3_CONFIG)
+    return _s3
+
+
+def _reset_s3_client() -> None:
+    global _s3
+    _s3 = None
+
+
+# A forked child mustn't share the parent's pooled connections, so it builds its own client on first use.
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_s3_client)
+
+
+# Large objects are sent as multi-part uploads, with the parts in flight concurrently, rather than as a single stream.
+S3_TRANSFER_CONFIG = TransferConfig(multipart_threshold=8*1024*1024, multipart_chunksize=8*1024*1024,
+                                    max_concurrency=4, use_threads=True)
+# Large objects are fetched as concurrent byte-range GETs written into place in the local file, so that a single
+# download isn't limited to the throughput of one stream; objects smaller than one part are fetched in one GET.
+S3_DOWNLOAD_CONFIG = TransferConfig(multipart_threshold=8*1024*1024, multipart_chunksize=8*1024*1024,
+                                    max_concurrency=8, use_threads=True)
+
+# Suffix for objects compressed with Zstandard (e.g., 'file.wibl.zst'), which are decompressed as they are obtained
+ZSTD_SUFFIX = '.zst'
+
 
 ## Dataclass to hold the specification for a single item of data being processed
 #
@@ -95,6 +143,66 @@ class MultiDataItem:
     meta: Dict[str, Any] = None
 
 
+## Extract the identification information for a GeoJSON file from its metadata
+#
+# Find the source ID, logger name, and number of soundings for a GeoJSON file, in the same form as the tags
+# that are set on GeoJSON objects in the cloud store, from the metadata in the file itself.
+#
+# \param data       GeoJSON structure from the file
+# \param verbose    Flag: True => report problems with the metadata
+# \return Dictionary with 'sourceID', 'logger', and 'soundings' for the file
+
+def geojson_info(data: Dict[str,Any], verbose: bool) -> Dict[str,Any]:
+    # We need to make sure that we get the source ID from the right location in the
+    # metadata --- it varies between V2 and V3 metadata (and possibly from others)
+    sourceID: str = ''
+    if 'trustedNode' in data['properties']:
+        # This was added in V3.1 of the metadata specification
+        if data['properties']['trustedNode']['convention'] == 'GeoJSON CSB 3.1':
+            sourceID = data['properties']['trustedNode']['uniqueVesselID']
+        else:
+            # If we don't get a convention that we recognise, we can at least check to see
+            # whether the vessel ID is still in the same place
+            if 'uniqueVesselID' in data['properties']['trustedNode']:
+                sourceID = data['properties']['trustedNode']['uniqueVesselID']
+            else:
+                if verbose:
+                    print('error: failed to find a unique vessel ID in metadata.')
+    else:
+        if 'convention' in data['properties']:
+            # This was the case in V2 and V3.0 metadata, but we should check that it's a version
+            # that we understand.  This is more a nicety than anything else: there was
+            # only one version, so this should always pass!
+            if data['properties']['convention'] in ('CSB 2.0', 'GeoJSON CSB 3.0'):
+                sourceID = data['properties']['platform']['uniqueID']
+            else:
+                if verbose:
+                    print('error: unrecognised CSB metadata convention.')
+    return {
+        'sourceID': sourceID,
+        'logger': data['properties']['platform']['IDNumber'],
+        'soundings': len(data['features'])
+    }
+
+
+## Determine the local filename and destination object key for a source object
+#
+# The local copy of the source object (and the converted output) are named for the source object, without the
+# compression suffix if the object is compressed, since the local copy is decompressed as it is obtained.
+#
+# \param source_object  Key of the source object
+# \return Tuple of the local filename, and the destination object key
+
+def _local_and_dest_names(source_object: str) -> Tuple[str, str]:
+    if source_object.endswith(ZSTD_SUFFIX):
+        source_object = source_object[:-len(ZSTD_SUFFIX)]
+    if '.wibl' in source_object:
+        dest_object = source_object.replace('.wibl', '.json')
+    else:
+        dest_object = source_object
+    return f'/tmp/{source_object}', dest_object
+
+
 ## Abstract base class for a collection of data items to be processed
 #
 # Different cloud providers specify where to find the data to be processed in different ways.  This class
@@ -138,12 +246,8 @@ class AWSSource(DataSource):
                     source_bucket = message['bucket']
                     source_object = unquote_plus(message['filename'])
                     source_size = message['size']
-                    local_file = f'/tmp/{source_object}'
+                    local_file, dest_object = _local_and_dest_names(source_object)
                     dest_bucket = getenv('DEST_BUCKET')
-                    if '.wibl' in source_object:
-                        dest_object = source_object.replace('.wibl', '.json')
-                    else:
-                        dest_object = source_object
                     dest_size = 0
                     self.items.append(DataItem(source_bucket, source_object, source_size, local_file, dest_bucket, dest_object, dest_size))
         if config['verbose']:
@@ -210,12 +314,8 @@ class AWSSourceSNSTrigger(DataSource):
                     source_bucket = s3_bucket['name']
                     source_object = unquote_plus(s3_object['key'])
                     source_size = s3_object['size']
-                    local_file = f'/tmp/{source_object}'
+                    local_file, dest_object = _local_and_dest_names(source_object)
                     dest_bucket = getenv('DEST_BUCKET')
-                    if '.wibl' in source_object:
-                        dest_object = source_object.replace('.wibl', '.json')
-                    else:
-                        dest_object = source_object
                     dest_size = 0
                     self.items.append(
                         DataItem(source_bucket, source_object, source_size, local_file, dest_bucket, dest_object,
@@ -400,6 +500,19 @@ class CloudController(ABC):
     def upload(self, localname: str, dest_key: str) -> None:
         pass
 
+    ## Copy an object from the source store to the destination store unchanged
+    #
+    # Copy the source object for an item directly into the destination store, setting the same tags as
+    # \a transmit(), for files that need no conversion.
+    #
+    # \param meta       Specification for the object source and destination
+    # \param sourceID   UniqueID for the source data, to set on the object store
+    # \param logger     Logger name for the source file
+    # \param soundings  Number of soundings in the file
+    @abstractmethod
+    def copy(self, meta: DataItem, sourceID: str, logger: str, soundings: int) -> None:
+        pass
+
 
 ## Concrete implementation of the CloudController model for AWS S3 buckets
 #
@@ -415,9 +528,14 @@ class AWSController(CloudController):
     #   "verbose"           Flag: True => provide more information on what's going on
     #
     # \param config Configuration dictionary for the algorithm
-    def __init__(self, config: Dict[str,Any]):
+    # \param client Optional boto3 S3 client to use, rather than the shared one
+    def __init__(self, config: Dict[str,Any], client=None):
         self.destination = getenv('DEST_BUCKET')
         self.verbose = config['verbose']
+        # Low-level client on the shared, pooled S3 interface (unless one is provided, e.g., in a child process that
+        # can't share the parent's connections), held for the life of the controller so that each transfer can reuse
+        # open connections; unlike the resource interface, the client is thread-safe.
+        self.client = client if client is not None else s3_client()
 
     ## Test whether a specified object exists in the provider's cloud store
     #
@@ -427,12 +545,10 @@ class AWSController(CloudController):
     # \return Tuple[bool, Optional[int]] (True, size in bytes) if the specified object exists,
     #   (False, None) if the specified object doesn't exist.
     def exists(self, meta: DataItem) -> Tuple[bool, Optional[int]]:
-        cli = boto3.client('s3')
         if self.verbose:
             print(f'Testing existence of object {meta.source_key} from bucket {meta.source_store}')
         try:
-            response = cli.head_object(Bucket=meta.source_store,
-                                       Key=meta.source_key)
+            response = self.client.head_object(Bucket=meta.source_store, Key=meta.source_key)
             return True, response['ContentLength']
         except botocore.exceptions.ClientError as e:
             if e.response['ResponseMetadata']['HTTPStatusCode'] == 404:
@@ -451,8 +567,24 @@ class AWSController(CloudController):
     def obtain(self, meta: DataItem) -> Tuple[str, Dict[str,Any]]:
         if self.verbose:
             print(f'Downloading from bucket {meta.source_store} object {meta.source_key} to local file {meta.localname}')
-        s3.Bucket(meta.source_store).download_file(meta.source_key, meta.localname)
-        tags = boto3.client('s3').get_object_tagging(Bucket=meta.source_store, Key=meta.source_key)
+        if meta.source_key.endswith(ZSTD_SUFFIX):
+            # Compressed objects are decompressed as they stream in, so only the compressed bytes cross the network
+            if zstandard is None:
+                raise RuntimeError(f'zstandard is required to decompress {meta.source_key}.')
+            response = self.client.get_object(Bucket=meta.source_store, Key=meta.source_key)
+            with open(meta.localname, 'wb') as f:
+                zstandard.ZstdDecompressor().copy_stream(response['Body'], f)
+        elif isinstance(meta.source_size, int) and 0 < meta.source_size < S3_DOWNLOAD_CONFIG.multipart_threshold:
+            # The size is known from the event, and the object is small enough to fetch in one piece, so a single GET
+            # will do (the transfer manager would otherwise add a HEAD round-trip to find the size first).
+            response = self.client.get_object(Bucket=meta.source_store, Key=meta.source_key)
+            with open(meta.localname, 'wb') as f:
+                for chunk in response['Body'].iter_chunks(1024*1024):
+                    f.write(chunk)
+            meta.source_size = response['ContentLength']
+        else:
+            self.client.download_file(meta.source_store, meta.source_key, meta.localname, Config=S3_DOWNLOAD_CONFIG)
+        tags = self.client.get_object_tagging(Bucket=meta.source_store, Key=meta.source_key)
         info: Dict[str,Any] = {'sourceID': '', 'logger': '', 'soundings': -1}
         for tag in tags['TagSet']:
             if tag['Key'] == 'SourceID':
@@ -476,8 +608,9 @@ class AWSController(CloudController):
     # \param sourceID   UniqueID associated with the data (for key-value metadata tag)
     # \param logger     Logger name for the source file
     # \param soundings  Number of soundings in the transmitted file
-    # \param data       Data to transfer into the cloud store
-    def transmit(self, meta: DataItem, sourceID: str, logger: str, soundings: int, data: str) -> None:
+    # \param data       Data to transfer into the cloud store, either encoded or as a readable binary file-like object
+    def transmit(self, meta: DataItem, sourceID: str, logger: str, soundings: int,
+                 data: Union[bytes, BinaryIO]) -> None:
         if self.verbose:
             print(f'Transmitting {meta.localname} to bucket {self.destination}, key {meta.dest_key}, source ID {sourceID}')
         tags = urlencode({
@@ -485,8 +618,10 @@ class AWSController(CloudController):
             'Logger': logger,
             'Soundings': soundings
         })
-        s3.Bucket(self.destination).put_object(Key=meta.dest_key, Body=data,
-                                               Tagging=tags)
+        if isinstance(data, (bytes, bytearray)):
+            data = io.BytesIO(data)
+        self.client.upload_fileobj(data, self.destination, meta.dest_key,
+                                   ExtraArgs={'Tagging': tags}, Config=S3_TRANSFER_CONFIG)
 
     ## Upload local (temp) file to an AWS S3 bucket/key
     #
@@ -495,7 +630,34 @@ class AWSController(CloudController):
     def upload(self, localname: str, dest_key: str) -> None:
         if self.verbose:
             print(f'Uploading {localname} to bucket {self.destination}, key {dest_key}.')
-        s3.Bucket(self.destination).upload_file(localname, dest_key)
+        self.client.upload_file(localname, self.destination, dest_key)
+
+    ## Copy an object from the source bucket to the destination bucket unchanged
+    #
+    # The copy is done server-side by S3, so the data doesn't pass through the Lambda (unless the source object is
+    # compressed).
+    #
+    # \param meta       Specification for the object source and destination
+    # \param sourceID   UniqueID for the source data, to set on the object store
+    # \param logger     Logger name for the source file
+    # \param soundings  Number of soundings in the file
+    def copy(self, meta: DataItem, sourceID: str, logger: str, soundings: int) -> None:
+        if self.verbose:
+            print(f'Copying bucket {meta.source_store} object {meta.source_key} to bucket {self.destination}, '
+                  f'key {meta.dest_key}, source ID {sourceID}')
+        tags = urlencode({
+            'SourceID': sourceID,
+            'Logger': logger,
+            'Soundings': soundings
+        })
+        if meta.source_key.endswith(ZSTD_SUFFIX):
+            # The destination has to be uncompressed, so it's sent from the (decompressed) local copy instead
+            self.client.upload_file(meta.localname, self.destination, meta.dest_key,
+                                    ExtraArgs={'Tagging': tags}, Config=S3_TRANSFER_CONFIG)
+        else:
+            self.client.copy_object(CopySource={'Bucket': meta.source_store, 'Key': meta.source_key},
+                                    Bucket=self.destination, Key=meta.dest_key,
+                                    Tagging=tags, TaggingDirective='REPLACE')
 
 
 ## \class LocalController
@@ -539,35 +701,7 @@ class LocalController(CloudController):
         # pairs that we have in S3, so we read the file, and find them directly (if the file is JSON)
         if 'json' in meta.localname:
             with open(meta.localname, 'r') as f:
-                data = json.load(f)
-                # We need to make sure that we get the source ID from the right location in the
-                # metadata --- it varies between V2 and V3 metadata (and possibly from others)
-                sourceID: str = ''
-                if 'trustedNode' in data['properties']:
-                    # This was added in V3.1 of the metadata specification
-                    if data['properties']['trustedNode']['convention'] == 'GeoJSON CSB 3.1':
-                        sourceID = data['properties']['trustedNode']['uniqueVesselID']
-                    else:
-                        # If we don't get a convention that we recognise, we can at least check to see
-                        # whether the vessel ID is still in the same place
-                        if 'uniqueVesselID' in data['properties']['trustedNode']:
-                            sourceID = data['properties']['trustedNode']['uniqueVesselID']
-                        else:
-                            if self.verbose:
-                                print('error: failed to find a unique vessel ID in metadata.')
-                else:
-                    if 'convention' in data['properties']:
-                        # This was the case in V2 and V3.0 metadata, but we should check that it's a version
-                        # that we understand.  This is more a nicety than anything else: there was
-                        # only one version, so this should always pass!
-                        if data['properties']['convention'] in ('CSB 2.0', 'GeoJSON CSB 3.0'):
-                            sourceID = data['properties']['platform']['uniqueID']
-                        else:
-                            if self.verbose:
-                                print('error: unrecognised CSB metadata convention.')
-                info['sourceID'] = sourceID
-                info['logger'] = data['properties']['platform']['IDNumber']
-                info['soundings'] = len(data['features'])
+                info = geojson_info(json.load(f), self.verbose)
         return meta.localname, info
 
     ## Concrete implementation of code to save converted GeoJSON data
@@ -578,7 +712,10 @@ class LocalController(CloudController):
     # \param meta       Specification for the object being transferred into the cloud environment
     # \param sourceID   UniqueID associated with the data (for key-value metadata tag)
     # \param data       Data to transfer into the cloud store
-    def transmit(self, meta: DataItem, sourceID: str, logger: str, soundings: int, data: str) -> None:
+    def transmit(self, meta: DataItem, sourceID: str, logger: str, soundings: int,
+                 data: Union[bytes, BinaryIO]) -> None:
+        if not isinstance(data, (bytes, bytearray)):
+            data = data.read()
         if self.verbose:
             if len(data) > 1000:
                 prdata = str(data[0:1000]) + '...'
@@ -588,3 +725,17 @@ class LocalController(CloudController):
         with open(meta.dest_key, 'w') as f:
             json.dump(json.loads(data.decode('utf-8')), f, indent=4)
 
+
+    ## Concrete implementation of code to copy a file that needs no conversion
+    #
+    # Since the file output is in the local filesystem, the code here just copies the input file to the
+    # indicated output file.
+    #
+    # \param meta       Specification for the object source and destination
+    # \param sourceID   UniqueID associated with the data (for key-value metadata tag)
+    # \param logger     Logger name for the source file
+    # \param soundings  Number of soundings in the file
+    def copy(self, meta: DataItem, sourceID: str, logger: str, soundings: int) -> None:
+        if self.verbose:
+            print(f'Local conversion: copying {meta.localname} to {meta.dest_key}.')
+        shutil.copyfile(meta.localname, meta.dest_key)
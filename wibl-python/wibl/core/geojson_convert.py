@@ -32,8 +32,16 @@
 # OR OTHER DEALINGS IN THE SOFTWARE.
 
 import json
-from datetime import datetime, timezone
-from typing import Dict, Any
+import math
+import time
+from typing import Dict, Any, BinaryIO, Iterator, List
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 from wibl.core import getenv, Lineage
 from wibl.core.algorithm import AlgorithmPhase
@@ -42,6 +50,40 @@ from wibl.core.algorithm.runner import run_algorithms
 
 FMT_OBS_TIME='%Y-%m-%dT%H:%M:%S.%fZ'
 
+def format_obs_time(t: float) -> str:
+    """
+    Format a POSIX timestamp (in UTC) as an observation time string, as FMT_OBS_TIME would with a timezone-aware
+    datetime, but without constructing the datetime.  The microseconds are rounded in the same way as
+    `datetime.fromtimestamp()`, so the output is identical.
+
+    :param t:   Time in seconds since the epoch
+    :return:    Time formatted as FMT_OBS_TIME
+    """
+    # Flooring (rather than truncating towards zero) keeps the fraction positive for times before the epoch
+    whole = math.floor(t)
+    us = round((t - whole)*1e6)
+    if us >= 1_000_000:
+        whole += 1
+        us -= 1_000_000
+    return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(whole)) + '.%06dZ' % us
+
+
+# Number of features formatted into each write() when streaming the GeoJSON output
+STREAM_CHUNK_FEATURES = 4096
+
+
+def _soundings(data: Dict[str,Any]) -> Iterator:
+    """
+    Walk the soundings in the data dictionary as (time, longitude, latitude, depth) tuples of native
+    Python values, with the time formatted as required for the GeoJSON output.  The sounding arrays are
+    converted to lists of native floats in one bulk pass each, and then walked together, rather than
+    indexing into each (numpy) array separately for every sounding.
+    """
+    depth = data['depth']
+    times, lons, lats, depths = (np.asarray(depth[k]).tolist() for k in ('t', 'lon', 'lat', 'z'))
+    for t, lon, lat, z in zip(times, lons, lats, depths):
+        yield format_obs_time(t), lon, lat, z
+
 
 def translate(data: Dict[str,Any], lineage: Lineage, filename: str, config: Dict[str,Any], *,
               process_algorithms: bool = False) -> Dict[str,Any]:
@@ -70,26 +112,102 @@ def translate(data: Dict[str,Any], lineage: Lineage, filename: str, config: Dict
     verbose = config.get('verbose', False)
     feature_lst = []
 
-    for i in range(len(data['depth']['z'])):
-        timestamp = datetime.fromtimestamp(data['depth']['t'][i], tz=timezone.utc).strftime(FMT_OBS_TIME)
-        
-        feature_dict = {
+    for timestamp, lon, lat, z in _soundings(data):
+        feature_lst.append({
             "type": "Feature",
             "geometry": {
                 "type": "Point",
                 "coordinates": [
-                data['depth']['lon'][i],
-                data['depth']['lat'][i]
+                lon,
+                lat
                 ]
             },
             "properties": {
-                "depth": data['depth']['z'][i],
+                "depth": z,
                 "time": timestamp
             }
-        }
+        })
 
-        feature_lst.append(dict(feature_dict))
+    final_json_dict = _collection(data, feature_lst)
 
+    if process_algorithms:
+        final_json_dict = run_algorithms(final_json_dict,
+                                         data['algorithms'],
+                                         AlgorithmPhase.AFTER_GEOJSON_CONVERSION,
+                                         filename,
+                                         lineage,
+                                         verbose)
+
+    _finalise_lineage(data, lineage, final_json_dict)
+
+    return final_json_dict
+
+
+def translate_stream(data: Dict[str,Any], lineage: Lineage, filename: str, config: Dict[str,Any], out: BinaryIO, *,
+                     process_algorithms: bool = False) -> Dict[str,Any]:
+    """
+    Translate from the internal working data dictionary to GeoJSON as for :func:`translate`, but write the
+    encoded (UTF-8) GeoJSON directly to `out` rather than returning it.  The features are formatted straight
+    into the output in chunks, so that the complete list of per-sounding dictionaries (which is only ever walked
+    once by the encoder) is never built.  Algorithms for `AlgorithmPhase.AFTER_GEOJSON_CONVERSION` need the complete
+    structure, however, so if they are enabled this falls back to encoding the output of :func:`translate`.
+
+    :param data:     Data dictionary from time-interpolation and clean-up
+    :type data:      Dict[str,Any] with at least 'depth', 'loggername', 'platform', and 'loggerversion'
+    :param lineage:  `wibl.core.Lineage` instance used to track any processing done on `data`
+    :poram filename: str representing name of original WIBL file being translated to GeoJSON
+    :param config:   Configuration parameters from defaults file for instasll
+    :type config:    Dict[str,Any] (see config.py for details)
+    :param out:      Binary stream to write the GeoJSON into
+    :param process_algorithms: Bool set True to enable execution of algorithms for `AlgorithmPhase.AFTER_GEOJSON_CONVERSION`
+    :return:         Data dictionary with the GeoJSON tags (other than the features) written to `out`
+    :rtype:          Dict[str,Any]
+    :raises:         UnknownAlgorithm if an unknown processing algorithm is encountered
+    """
+    if process_algorithms:
+        final_json_dict = translate(data, lineage, filename, config, process_algorithms=True)
+        out.write(_encode(final_json_dict))
+        return final_json_dict
+
+    final_json_dict = _collection(data, [])
+    _finalise_lineage(data, lineage, final_json_dict)
+    del final_json_dict['features']
+
+    # The features go last in the collection, so the header is written without its closing brace, and then
+    # the features are appended before closing the collection.
+    out.write(_encode(final_json_dict)[:-1])
+    out.write(b',"features":[')
+    # Features are encoded a chunk at a time (as a list, stripping the brackets), so that only one chunk of
+    # feature dictionaries exists at any one time.
+    separator = b''
+    chunk: List[Dict[str,Any]] = []
+    for timestamp, lon, lat, z in _soundings(data):
+        chunk.append({"type": "Feature",
+                      "geometry": {"type": "Point", "coordinates": [lon, lat]},
+                      "properties": {"depth": z, "time": timestamp}})
+        if len(chunk) == STREAM_CHUNK_FEATURES:
+            out.write(separator + _encode(chunk)[1:-1])
+            separator = b','
+            chunk = []
+    if chunk:
+        out.write(separator + _encode(chunk)[1:-1])
+    out.write(b']}')
+    return final_json_dict
+
+
+def _encode(json_dict: Any) -> bytes:
+    """
+    Encode a GeoJSON structure as compact UTF-8 JSON, using orjson where it is available.
+    """
+    if orjson is not None:
+        return orjson.dumps(json_dict, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(json_dict, separators=(',', ':')).encode('utf-8')
+
+
+def _collection(data: Dict[str,Any], feature_lst: List[Dict[str,Any]]) -> Dict[str,Any]:
+    """
+    Build the GeoJSON FeatureCollection for the features given, with the metadata for the logger and platform.
+    """
     final_json_dict: dict[str, Any] = {
         "type": "FeatureCollection",
         "crs": {
@@ -151,14 +269,13 @@ def translate(data: Dict[str,Any], lineage: Lineage, filename: str, config: Dict
     # to make sure that any changes to the /properties/trustedNode are propagated
     final_json_dict['properties']['platform']['uniqueID'] = final_json_dict['properties']['trustedNode']['uniqueVesselID']
 
-    if process_algorithms:
-        final_json_dict = run_algorithms(final_json_dict,
-                                         data['algorithms'],
-                                         AlgorithmPhase.AFTER_GEOJSON_CONVERSION,
-                                         filename,
-                                         lineage,
-                                         verbose)
+    return final_json_dict
 
+
+def _finalise_lineage(data: Dict[str,Any], lineage: Lineage, final_json_dict: Dict[str,Any]) -> None:
+    """
+    Add the processing lineage for the data into the GeoJSON metadata.
+    """
     # The last phase of algorithms has been run, finalize lineage into a list of dicts that can easily be
     # serialized into the GeoJSON output
     if not lineage.empty():
@@ -168,5 +285,3 @@ def translate(data: Dict[str,Any], lineage: Lineage, filename: str, config: Dict
         if 'processing' not in final_json_dict['properties']:
             final_json_dict['properties']['processing'] = []
         final_json_dict['properties']['processing'] += data['lineage']
-
-    return final_json_dict
@@ -118,9 +118,13 @@ class InterpTable:
         for yvar in yvars:
             if yvar not in self.vars:
                 raise NoSuchVariable()
+        # The table is held as lists while it's being built, so convert the independent variable once for all of
+        # the dependent variables, rather than having np.interp() convert it again for each one.
+        x = np.ascontiguousarray(x, dtype=np.float64)
+        xp = np.asarray(self.vars['ind'], dtype=np.float64)
         rtn = []
         for yvar in yvars:
-            rtn.append(np.interp(x, self.vars['ind'], self.vars[yvar]))
+            rtn.append(np.interp(x, xp, np.asarray(self.vars[yvar], dtype=np.float64)))
         return rtn
     
     ## Determine the number of points in the independent variable array
@@ -179,12 +179,17 @@ class DataPacket(ABC):
     #
     # \param f  Binary output file
     def serialise(self, f: io.BufferedWriter) -> None:
+        f.write(self.serialised())
+
+    ## Generate the serialised form of the current packet
+    #
+    # This provides the packet header and payload as they would be written into the binary output file, so
+    # that multiple packets can be written together.
+    #
+    # \return Bytes for the packet header and payload
+    def serialised(self) -> bytes:
         buffer = self.payload()
-        id = self.id()
-        #print(f'Writing packet with ID {id} and buffer length {len(buffer)}.')
-        f.write(id.to_bytes(4, 'little'))
-        f.write(len(buffer).to_bytes(4, 'little'))
-        f.write(buffer)
+        return _PACKET_HEADER.pack(self.id(), len(buffer)) + buffer
 
     ## Implement the printable interface for this class, allowing it to be streamed
     #
@@ -197,6 +202,20 @@ class DataPacket(ABC):
         return rtn
 
 
+## Fixed layouts of the NMEA2000-derived packets
+#
+# Each packet with a fixed binary layout has its format compiled once here, rather than having struct look the
+# format string up in its cache for every packet packed or unpacked.
+_SYSTEM_TIME = struct.Struct('<HdIB')
+_ATTITUDE = struct.Struct('<HdIddd')
+_DEPTH = struct.Struct('<HdIddd')
+_COG = struct.Struct('<HdIdd')
+_GNSS = struct.Struct('<HdIHddddBBBdddBBHd')
+_ENVIRONMENT = struct.Struct('<HdIBdBdd')
+_TEMPERATURE = struct.Struct('<HdIBd')
+_HUMIDITY = struct.Struct('<HdIBd')
+_PRESSURE = struct.Struct('<HdIBd')
+
 ## Implementation of the SystemTime NMEA2000 packet
 #
 # This retrieves the timestamp, logger elapsed time, and time source for a SystemTime packet serialised into the file.
@@ -224,7 +243,7 @@ class SystemTime(DataPacket):
     # \param self   Pointer to the object
     # \param buffer Bytes buffer from which to unpack binary data
     def buffer_constructor(self, buffer: bytes) -> None:
-        (date, timestamp, elapsed_time, data_source) = struct.unpack('<HdIB', buffer)
+        (date, timestamp, elapsed_time, data_source) = _SYSTEM_TIME.unpack(buffer)
         ## Source of the timestamp (see documentation for decoding, but at least GNSS)
         self.data_source = data_source
         DataPacket.__init__(self, date, timestamp, elapsed_time)
@@ -244,7 +263,7 @@ class SystemTime(DataPacket):
             raise SpecificationError('Bad packet parameters') from e
     
     def payload(self) -> bytes:
-        buffer = struct.pack('<HdIB', self.date, self.timestamp, self.elapsed, self.data_source)
+        buffer = _SYSTEM_TIME.pack(self.date, self.timestamp, self.elapsed, self.data_source)
         return buffer
     
     def id(self) -> int:
@@ -296,7 +315,7 @@ class Attitude(DataPacket):
     # \param self   Pointer to the object
     # \param buffer Bytes byffer from which to unpack binary data
     def buffer_constructor(self, buffer: bytes) -> None:
-        (date, timestamp, elapsed_time, yaw, pitch, roll) = struct.unpack("<HdIddd", buffer)
+        (date, timestamp, elapsed_time, yaw, pitch, roll) = _ATTITUDE.unpack(buffer)
         ## Yaw angle of the ship, radians (+ve clockwise from north)
         self.yaw = yaw
         ## Pitch angle of the ship, radians (+ve bow up)
@@ -306,7 +325,7 @@ class Attitude(DataPacket):
         DataPacket.__init__(self, date, timestamp, elapsed_time)
 
     def payload(self) -> bytes:
-        buffer = struct.pack('<HdIddd', self.date, self.timestamp, self.elapsed, self.yaw, self.pitch, self.roll)
+        buffer = _ATTITUDE.pack(self.date, self.timestamp, self.elapsed, self.yaw, self.pitch, self.roll)
         return buffer
     
     ## Generate a synthetic packet based on keywords
@@ -376,7 +395,7 @@ class Depth(DataPacket):
     # \param self   Pointer to the object
     # \param buffer Bytes buffer from which to unpack binary data
     def buffer_constructor(self, buffer: bytes) -> None:
-        (date, timestamp, elapsed_time, depth, offset, range) = struct.unpack('<HdIddd', buffer)
+        (date, timestamp, elapsed_time, depth, offset, range) = _DEPTH.unpack(buffer)
         ## Observed depth below transducer, metres
         self.depth = depth
         ## Offset for depth, metres.
@@ -388,7 +407,7 @@ class Depth(DataPacket):
         super().__init__(date, timestamp, elapsed_time)
 
     def payload(self) -> bytes:
-        buffer = struct.pack('<HdIddd', self.date, self.timestamp, self.elapsed, self.depth, self.offset, self.range)
+        buffer = _DEPTH.pack(self.date, self.timestamp, self.elapsed, self.depth, self.offset, self.range)
         return buffer
     
     def id(self) -> int:
@@ -458,7 +477,7 @@ class COG(DataPacket):
     # \param self   Pointer to the objet
     # \param buffer Bytes buffer from which to unpack binary data
     def buffer_constructor(self, buffer: bytes) -> None:
-        (date, timestamp, elapsed_time, courseOverGround, speedOverGround) = struct.unpack('<HdIdd', buffer)
+        (date, timestamp, elapsed_time, courseOverGround, speedOverGround) = _COG.unpack(buffer)
         ## Course over ground (radians)
         self.courseOverGround = courseOverGround
         ## Speed over ground (m/s)
@@ -466,7 +485,7 @@ class COG(DataPacket):
         super().__init__(date, timestamp, elapsed_time)
     
     def payload(self) -> bytes:
-        buffer = struct.pack('<HdIdd', self.date, self.timestamp, self.elapsed, self.courseOverGround, self.speedOverGround)
+        buffer = _COG.pack(self.date, self.timestamp, self.elapsed, self.courseOverGround, self.speedOverGround)
         return buffer
 
     def id(self) -> int:
@@ -541,7 +560,7 @@ class GNSS(DataPacket):
     def buffer_constructor(self, buffer: bytes) -> None:
         (sys_date, sys_timestamp, sys_elapsed, date, timestamp, latitude, longitude, altitude,
          receiverType, receiverMethod, numSVs, horizontalDOP, positionDOP, separation, numRefStations, refStationType,
-         refStationID, correctionAge) = struct.unpack('<HdIHddddBBBdddBBHd', buffer)
+         refStationID, correctionAge) = _GNSS.unpack(buffer)
         ## In-message date (days since epoch)
         self.msg_date = date
         ## In-message timestamp (seconds since midnight)
@@ -575,10 +594,10 @@ class GNSS(DataPacket):
         super().__init__(sys_date, sys_timestamp, sys_elapsed)
     
     def payload(self) -> bytes:
-        buffer = struct.pack('<HdIHddddBBBdddBBHd', self.date, self.timestamp, self.elapsed, self.msg_date, self.msg_timestamp,
-                                                    self.latitude, self.longitude, self.altitude, self.receiverType, self.receiverMethod,
-                                                    self.numSVs, self.horizontalDOP, self.positionDOP, self.separation,
-                                                    self.numRefStations, self.refStationType, self.refStationID, self.correctionAge)
+        buffer = _GNSS.pack(self.date, self.timestamp, self.elapsed, self.msg_date, self.msg_timestamp,
+                            self.latitude, self.longitude, self.altitude, self.receiverType, self.receiverMethod,
+                            self.numSVs, self.horizontalDOP, self.positionDOP, self.separation,
+                            self.numRefStations, self.refStationType, self.refStationID, self.correctionAge)
         return buffer
     
     def id(self) -> int:
@@ -690,7 +709,7 @@ class Environment(DataPacket):
     # \param buffer Bytes buffer from which to unpack binary data
     def buffer_constructor(self, buffer: bytes) -> None:
         (date, timestamp, elapsed_time, tempSource, temperature, humiditySource, humidity, pressure) = \
-            struct.unpack('<HdIBdBdd', buffer)
+            _ENVIRONMENT.unpack(buffer)
         ## Source of temperature information (e.g., inside, outside)
         self.tempSource = tempSource
         ## Current temperature, Kelvin
@@ -706,7 +725,7 @@ class Environment(DataPacket):
         super().__init__(date, timestamp, elapsed_time)
 
     def payload(self) -> bytes:
-        buffer = struct.pack('<HdIBdBdd', self.date, self.timestamp, self.elapsed, self.tempSource, self.temperature, self.humiditySource, self.humidity, self.pressure)
+        buffer = _ENVIRONMENT.pack(self.date, self.timestamp, self.elapsed, self.tempSource, self.temperature, self.humiditySource, self.humidity, self.pressure)
         return buffer
 
     def id(self) -> int:
@@ -783,7 +802,7 @@ class Temperature(DataPacket):
     # \param self   Pointer to the object
     # \param buffer Bytes object from which to unpack binary data
     def buffer_constructor(self, buffer: bytes) -> None:
-        (date, timestamp, elapsed_time, tempSource, temperature) = struct.unpack('<HdIBd', buffer)
+        (date, timestamp, elapsed_time, tempSource, temperature) = _TEMPERATURE.unpack(buffer)
         ## Source of temperature information (e.g., water, air, cabin)
         self.tempSource = tempSource
         ## Temperature of source, Kelvin
@@ -791,7 +810,7 @@ class Temperature(DataPacket):
         super().__init__(date, timestamp, elapsed_time)
 
     def payload(self) -> bytes:
-        buffer = struct.pack('<HdIBd', self.date, self.timestamp, self.elapsed, self.tempSource, self.tempSource)
+        buffer = _TEMPERATURE.pack(self.date, self.timestamp, self.elapsed, self.tempSource, self.tempSource)
         return buffer
 
     def id(self) -> int:
@@ -862,7 +881,7 @@ class Humidity(DataPacket):
     # \param self   Pointer to the object
     # \param buffer Bytes object from which to unpack the binary data
     def buffer_constructor(self, buffer: bytes) -> None:
-        (date, timestamp, elapsed_time, humiditySource, humidity) = struct.unpack('<HdIBd', buffer)
+        (date, timestamp, elapsed_time, humiditySource, humidity) = _HUMIDITY.unpack(buffer)
         ## Source of humidity (e.g., inside, outside)
         self.humiditySource = humiditySource
         ## Humidity observation, percent
@@ -870,7 +889,7 @@ class Humidity(DataPacket):
         super().__init__(date, timestamp, elapsed_time)
     
     def payload(self) -> bytes:
-        buffer = struct.pack('<HdIBd', self.date, self.timestamp, self.elapsed, self.humiditySource, self.humidity)
+        buffer = _HUMIDITY.pack(self.date, self.timestamp, self.elapsed, self.humiditySource, self.humidity)
         return buffer
     
     def id(self) -> int:
@@ -941,7 +960,7 @@ class Pressure(DataPacket):
     # \param self   Pointer to the object
     # \param buffer Bytes object from which to unpack the information
     def buffer_constructor(self, buffer: bytes) -> None:
-        (date, timestamp, elapsed_time, pressureSource, pressure) = struct.unpack('<HdIBd', buffer)
+        (date, timestamp, elapsed_time, pressureSource, pressure) = _PRESSURE.unpack(buffer)
         ## Source of pressure measurement (e.g., atmospheric, compressed air)
         self.pressureSource = pressureSource
         ## Pressure, Pascals
@@ -949,7 +968,7 @@ class Pressure(DataPacket):
         super().__init__(date, timestamp, elapsed_time)
     
     def payload(self) -> bytes:
-        buffer = struct.pack('<HdIBd', self.date, self.timestamp, self.elapsed, self.pressureSource, self.pressure)
+        buffer = _PRESSURE.pack(self.date, self.timestamp, self.elapsed, self.pressureSource, self.pressure)
         return buffer
     
     def id(self) -> int:
@@ -990,6 +1009,12 @@ class Pressure(DataPacket):
         rtn = super().__str__() + f' {self.name()}: pressure = {pressure_to_mbar(self.pressure)} mBar (source {self.pressureSource})'
         return rtn
 
+## Elapsed time (U32) at the start of a SerialString packet
+#
+# The rest of the packet is the string itself; packing the fixed part on its own avoids building (and caching) a
+# new format string for every length of string.
+_ELAPSED_TIME = struct.Struct('<I')
+
 ## Implement the NMEA0183 serial data message
 #
 # As an extension, the logger can (if the hardware is populated) record data from two separate RS-422 NMEA0183
@@ -1011,15 +1036,13 @@ class SerialString(DataPacket):
             self.data_constructor(**kwargs)
 
     def buffer_constructor(self, buffer: bytes) -> None:
-        string_length = len(buffer) - 4
-        (elapsed_time, data) = struct.unpack(f'<I{string_length}s', buffer)
+        (elapsed_time,) = _ELAPSED_TIME.unpack_from(buffer)
         ## Serial data encapsulated in the packet
-        self.data = data
+        self.data = bytes(buffer[4:])
         super().__init__(0, 0, elapsed_time)
 
     def payload(self) -> bytes:
-        data_len = len(self.data)
-        buffer = struct.pack(f'<I{data_len}s', self.elapsed, self.data)
+        buffer = _ELAPSED_TIME.pack(self.elapsed) + self.data
         return buffer
 
     def id(self) -> int:
@@ -1842,6 +1865,35 @@ class Setup(DataPacket):
         rtn = super().__str__() + f' {self.name()}: json = |{self.setup}|'
         return rtn
 
+## Header for each packet in the binary file: U32 (ID) U32 (length in bytes)
+_PACKET_HEADER = struct.Struct('<II')
+
+## Map from packet ID to the class that reconstitutes the packet
+#
+# This is used to dispatch on the packet ID with a single lookup, rather than testing the ID against each of the
+# packet types in turn for every packet read.
+_PACKET_CLASSES = {
+    PacketTypes.SerialiserVersion.value:    SerialiserVersion,
+    PacketTypes.SystemTime.value:           SystemTime,
+    PacketTypes.Attitude.value:             Attitude,
+    PacketTypes.Depth.value:                Depth,
+    PacketTypes.COG.value:                  COG,
+    PacketTypes.GNSS.value:                 GNSS,
+    PacketTypes.Environment.value:          Environment,
+    PacketTypes.Temperature.value:          Temperature,
+    PacketTypes.Humidity.value:             Humidity,
+    PacketTypes.Pressure.value:             Pressure,
+    PacketTypes.SerialString.value:         SerialString,
+    PacketTypes.Motion.value:               Motion,
+    PacketTypes.Metadata.value:             Metadata,
+    PacketTypes.AlgorithmRequest.value:     AlgorithmRequest,
+    PacketTypes.JSONMetadata.value:         JSONMetadata,
+    PacketTypes.NMEA0183Filter.value:       NMEA0183Filter,
+    PacketTypes.SensorScales.value:         SensorScales,
+    PacketTypes.RawIMU.value:               RawIMU,
+    PacketTypes.Setup.value:                Setup
+}
+
 ## Translate packets out of the binary file, reconstituing as an appropriate class
 #
 # This provides the primary interface for the user to the binary data generated by the logger.  Calling the next_packet
@@ -1871,56 +1923,20 @@ class PacketFactory:
         if self.end_of_file:
             return None
 
-        buffer = self.file.read(8)   # Header for each packet is U32 (ID) U32 (length in bytes)
+        buffer = self.file.read(_PACKET_HEADER.size)
 
-        if len(buffer) < 8:
+        if len(buffer) < _PACKET_HEADER.size:
             self.end_of_file = True
             return None
 
-        (pkt_id, pkt_len) = struct.unpack('<II', buffer)
+        (pkt_id, pkt_len) = _PACKET_HEADER.unpack(buffer)
         buffer = self.file.read(pkt_len)
+        packet_class = _PACKET_CLASSES.get(pkt_id)
+        if packet_class is None:
+            print(f'Unknown packet with ID {pkt_id} in input stream; ignored.')
+            return None
         try:
-            if pkt_id == PacketTypes.SerialiserVersion.value:
-                rtn = SerialiserVersion(buffer=buffer)
-            elif pkt_id == PacketTypes.SystemTime.value:
-                rtn = SystemTime(buffer=buffer)
-            elif pkt_id == PacketTypes.Attitude.value:
-                rtn = Attitude(buffer=buffer)
-            elif pkt_id == PacketTypes.Depth.value:
-                rtn = Depth(buffer=buffer)
-            elif pkt_id == PacketTypes.COG.value:
-                rtn = COG(buffer=buffer)
-            elif pkt_id == PacketTypes.GNSS.value:
-                rtn = GNSS(buffer=buffer)
-            elif pkt_id == PacketTypes.Environment.value:
-                rtn = Environment(buffer=buffer)
-            elif pkt_id == PacketTypes.Temperature.value:
-                rtn = Temperature(buffer=buffer)
-            elif pkt_id == PacketTypes.Humidity.value:
-                rtn = Humidity(buffer=buffer)
-            elif pkt_id == PacketTypes.Pressure.value:
-                rtn = Pressure(buffer=buffer)
-            elif pkt_id == PacketTypes.SerialString.value:
-                rtn = SerialString(buffer=buffer)
-            elif pkt_id == PacketTypes.Motion.value:
-                rtn = Motion(buffer=buffer)
-            elif pkt_id == PacketTypes.Metadata.value:
-                rtn = Metadata(buffer=buffer)
-            elif pkt_id == PacketTypes.AlgorithmRequest.value:
-                rtn = AlgorithmRequest(buffer=buffer)
-            elif pkt_id == PacketTypes.JSONMetadata.value:
-                rtn = JSONMetadata(buffer=buffer)
-            elif pkt_id == PacketTypes.NMEA0183Filter.value:
-                rtn = NMEA0183Filter(buffer=buffer)
-            elif pkt_id == PacketTypes.SensorScales.value:
-                rtn = SensorScales(buffer=buffer)
-            elif pkt_id == PacketTypes.RawIMU.value:
-                rtn = RawIMU(buffer=buffer)
-            elif pkt_id == PacketTypes.Setup.value:
-                rtn = Setup(buffer=buffer)
-            else:
-                print(f'Unknown packet with ID {pkt_id} in input stream; ignored.')
-                rtn = None
+            rtn = packet_class(buffer=buffer)
         except struct.error as e:
             raise PacketTranscriptionError(str(e))
 
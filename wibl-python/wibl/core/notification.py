@@ -25,7 +25,10 @@
 # FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
 # OR OTHER DEALINGS IN THE SOFTWARE.
 
+import os
+import threading
 from abc import ABC, abstractmethod
+from typing import List, Optional
 
 import boto3
 import botocore.exceptions as awsexe
@@ -38,16 +41,43 @@ class Notifier(ABC):
     def notify(self, item: DataItem) -> str:
         pass
 
+    def notify_batch(self, items: List[DataItem]) -> List[Optional[str]]:
+        return [self.notify(item) for item in items]
+
     def generate_message(self, item: DataItem) -> str:
         message = { "bucket": item.dest_store, "filename": item.dest_key, "size": item.dest_size }
         return json.dumps(message)
 
+# Maximum number of messages that SNS will accept in a single PublishBatch call
+SNS_BATCH_SIZE = 10
+
+# SNS client, shared by all notifiers (and across warm invocations of a Lambda); constructed on first use
+_sns = None
+
+
+def _sns_client():
+    global _sns
+    if _sns is None:
+        _sns = boto3.client('sns')
+    return _sns
+
+
+def _reset_sns_client() -> None:
+    global _sns
+    _sns = None
+
+
+# A forked child mustn't share the parent's pooled connections, so it builds its own client on first use.
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_sns_client)
+
+
 class SNSNotifier(Notifier):
     def __init__(self, arn: str) -> None:
         self.arn = arn
     
     def notify(self, item: DataItem) -> str:
-        sns = boto3.client('sns')
+        sns = _sns_client()
         try:
             result = sns.publish(TopicArn=self.arn, Message=self.generate_message(item))
             msgid = result['MessageId']
@@ -56,6 +86,25 @@ class SNSNotifier(Notifier):
             msgid = None
         return msgid
 
+    def notify_batch(self, items: List[DataItem]) -> List[Optional[str]]:
+        # Notifications are published up to SNS_BATCH_SIZE at a time, rather than a round-trip for each one
+        sns = _sns_client()
+        msgids: List[Optional[str]] = [None] * len(items)
+        for start in range(0, len(items), SNS_BATCH_SIZE):
+            entries = [{'Id': str(n), 'Message': self.generate_message(items[n])}
+                       for n in range(start, min(start + SNS_BATCH_SIZE, len(items)))]
+            try:
+                result = sns.publish_batch(TopicArn=self.arn, PublishBatchRequestEntries=entries)
+            except awsexe.ClientError as error:
+                print(f'error: notification failed: AWS SNS responded {error}.')
+                continue
+            for success in result.get('Successful', []):
+                msgids[int(success['Id'])] = success['MessageId']
+            for failure in result.get('Failed', []):
+                print(f'error: notification failed for {items[int(failure["Id"])].dest_key}: '
+                      f'AWS SNS responded {failure.get("Code")}: {failure.get("Message")}.')
+        return msgids
+
 class LocalNotifier(Notifier):
     def __init__(self, resource: str) -> None:
         self.resource = resource
@@ -63,3 +112,46 @@ class LocalNotifier(Notifier):
     def notify(self, item: DataItem) -> str:
         print(f'Local notification for resource {self.resource}, message {self.generate_message(item)}.')
         return self.resource
+
+
+# Collect the notifications for a number of items, so that they can be sent together with calls to the underlying
+# notifier's notify_batch().  A batch is sent as soon as it's full, so at most one partial batch is held back until
+# flush() is called (and the notifications for items already sent aren't lost if processing is cut short).  Items
+# may be added from multiple threads.
+class BatchNotifier(Notifier):
+    def __init__(self, notifier: Notifier) -> None:
+        self.notifier = notifier
+        self.pending: List[DataItem] = []
+        self.failed: List[DataItem] = []
+        self._lock = threading.Lock()
+
+    def notify(self, item: DataItem) -> str:
+        with self._lock:
+            self.pending.append(item)
+            if len(self.pending) < SNS_BATCH_SIZE:
+                return ''
+            items, self.pending = self.pending, []
+        self._send(items)
+        return ''
+
+    def _send(self, items: List[DataItem]) -> None:
+        try:
+            msgids = self.notifier.notify_batch(items)
+        except Exception as error:
+            print(f'error: notification failed: {error}.')
+            msgids = [None] * len(items)
+        failed = [item for item, msgid in zip(items, msgids) if msgid is None]
+        if failed:
+            with self._lock:
+                self.failed.extend(failed)
+
+    # Send any notifications still pending, and return the items for which notification has failed (here, or
+    # in a batch sent earlier) since the last flush.
+    def flush(self) -> List[DataItem]:
+        with self._lock:
+            items, self.pending = self.pending, []
+        if items:
+            self._send(items)
+        with self._lock:
+            failed, self.failed = self.failed, []
+        return failed
@@ -31,9 +31,13 @@
 # FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
 # OR OTHER DEALINGS IN THE SOFTWARE.
 
+import io
 import json
-from typing import Dict, Any
-from datetime import datetime
+import logging
+import multiprocessing
+import os
+from typing import Dict, Any, Optional, List
+from concurrent.futures import ThreadPoolExecutor
 
 import boto3
 
@@ -42,13 +46,51 @@ import wibl.core.logger_file as lf
 import wibl.core.datasource as ds
 import wibl.core.notification as nt
 from wibl.core.algorithm import UnknownAlgorithm
+from wibl import get_logger
 from wibl.core import getenv, Lineage
 import wibl.core.timestamping as ts
 import wibl.core.geojson_convert as gj
 from wibl.processing.cloud.aws import get_config_file
 from wibl_manager import ManagerInterface, MetadataType, WIBLMetadata, ProcessingStatus
 
-s3 = boto3.resource('s3')
+logger = get_logger()
+
+# Lambda containers are reused between invocations, so the configuration and the cloud interfaces built from it
+# are cached at module scope after the first (warm-start) invocation, rather than re-read and rebuilt every time.
+_config: Optional[Dict[str, Any]] = None
+_controller: Optional[ds.AWSController] = None
+_notifier: Optional[nt.SNSNotifier] = None
+
+
+def get_config() -> Dict[str, Any]:
+    """Read the configuration for the Lambda on first use, and return the cached copy thereafter.  A
+       configuration that fails to load is not cached, so that it can be retried on the next invocation.
+
+       :raises conf.BadConfiguration: if the configuration file can't be read
+    """
+    global _config, _controller, _notifier
+    if _config is None:
+        # The configuration file for the algorithm should be in the same directory as the lambda function file,
+        # and has a "well known" name.  We could attempt to something smarter here, but this is probably enough
+        # for now.
+        config = conf.read_config(get_config_file())
+        # We instantiate the AWS versions of CloudController and Notifier explicitly, since we can't be using
+        # anything else given the rest of the infrastructure here, which is AWS specific.
+        _controller = ds.AWSController(config)
+        _notifier = nt.SNSNotifier(getenv('NOTIFICATION_ARN'))
+        _config = config
+    return _config
+
+
+# When running in Lambda, build the configuration and cloud interfaces while the module is imported, so that the
+# cost falls in the Lambda's initialisation phase rather than the first invocation.  If that fails, lambda_handler()
+# tries again (and reports the problem) when it's called.  Anywhere else (local tools, tests), importing the module
+# has no side effects, and the configuration is only read if lambda_handler() is called.
+if 'AWS_LAMBDA_FUNCTION_NAME' in os.environ:
+    try:
+        get_config()
+    except Exception:
+        logger.exception('failed to initialise processing configuration; will retry on invocation')
 
 
 def read_local_event(event_file: str) -> Dict:
@@ -61,6 +103,49 @@ def read_local_event(event_file: str) -> Dict:
     return event
 
 
+def _is_geojson(local_file: str) -> bool:
+    """Determine whether a file is (probably) already GeoJSON, rather than WIBL binary.  A WIBL file starts with a
+       binary packet header, which can't be the opening brace of a JSON object.
+    """
+    with open(local_file, 'rb') as f:
+        return f.read(64).lstrip().startswith(b'{')
+
+
+def _pass_through(item: ds.DataItem, local_file: str, controller: ds.CloudController, notifier: nt.Notifier,
+                  manager: ManagerInterface, meta: WIBLMetadata, verbose: bool) -> bool:
+    """Send a file that is already GeoJSON to the destination object store unchanged, rather than converting it.
+       The metadata for the file is read from the GeoJSON, and the object is copied directly from the source store
+       (server-side, where the controller supports it).
+    """
+    try:
+        with open(local_file, 'rb') as f:
+            data = json.load(f)
+        if data.get('type') != 'FeatureCollection':
+            raise ValueError(f'GeoJSON type is {data.get("type")}, not FeatureCollection')
+        info = ds.geojson_info(data, verbose)
+        meta.platform = data['properties']['platform'].get('name', meta.platform)
+        features = data['features']
+        if features:
+            meta.starttime = features[0]['properties']['time']
+            meta.endtime = features[-1]['properties']['time']
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        manager.logmsg(f'error: failed to read GeoJSON file({local_file}): {str(e)}')
+        manager.update(meta)
+        return False
+    meta.logger = info['logger']
+    meta.observations = info['soundings']
+    meta.soundings = info['soundings']
+
+    controller.copy(item, info['sourceID'], info['logger'], info['soundings'])
+    # The destination is the (decompressed) local copy, not the source object, which may be compressed
+    item.dest_size = os.path.getsize(local_file)
+
+    meta.status = ProcessingStatus.PROCESSING_SUCCESSFUL.value
+    manager.update(meta)
+    notifier.notify(item)
+    return True
+
+
 def process_item(item: ds.DataItem, controller: ds.CloudController, notifier: nt.Notifier, config: Dict[str,Any]) -> bool:
     """Implement the business logic to translate the file from WIBL binary into a GeoJSON file.  The
        file with metadata in 'item' is pulled from object store using 'controller.obtain()', run through
@@ -71,34 +156,43 @@ def process_item(item: ds.DataItem, controller: ds.CloudController, notifier: nt
        might potentially stay in the input object store unless otherwise deleted.
     """
 
-    verbose: bool = config['verbose']
-
     meta: WIBLMetadata = WIBLMetadata()
     lineage: Lineage = Lineage()
     meta.size = item.source_size/(1024.0*1024.0)
     meta.status = ProcessingStatus.PROCESSING_FAILED.value  # Until further notice ...
     manager: ManagerInterface = ManagerInterface(MetadataType.WIBL_METADATA, item.source_key, config['verbose'])
     if not manager.register(meta.size):
-        print('error: failed to register file with REST management interface.')
-    
-    if verbose:
-        print(f'Attempting to obtain item {item} from S3 ...')
+        logger.error('failed to register file with REST management interface.')
+
+    logger.info('Attempting to obtain item %s from S3 ...', item)
 
     source_data: Dict = {}
     local_file, source_info = controller.obtain(item)
+    if _is_geojson(local_file):
+        logger.info('%s is already GeoJSON; passing through without conversion ...', local_file)
+        return _pass_through(item, local_file, controller, notifier, manager, meta, config['verbose'])
     try:
-        if verbose:
-            print(f'Attempting file read/time interpolation on {local_file} ...')
-        source_data = ts.time_interpolation(local_file, lineage,
-                                            config['elapsed_time_quantum'], verbose = config['verbose'], fault_limit = config['fault_limit'])
+        logger.info('Attempting file read/time interpolation on %s ...', local_file)
+        source_data = ts.time_interpolation(local_file, lineage, config['elapsed_time_quantum'],
+                                            verbose=config['verbose'],
+                                            fault_limit=config['fault_limit'])
         meta.logger = source_data['loggername']
         meta.platform = source_data['platform']
-        meta.observations = len(source_data['depth']['z'])
+        depth = source_data['depth']
+        meta.observations = len(depth['z'])
         meta.soundings = meta.observations
-        meta.starttime = datetime.fromtimestamp(source_data['depth']['t'][0]).isoformat()
-        meta.endtime = datetime.fromtimestamp(source_data['depth']['t'][-1]).isoformat()
+        if meta.soundings == 0:
+            # Nothing survived the processing algorithms (e.g., a file of only zero depths), so there's nothing to
+            # translate, or to submit to the staging bucket.
+            manager.logmsg(f'warning: no soundings remain in {local_file} after processing; nothing to submit.')
+            meta.status = ProcessingStatus.PROCESSING_SUCCESSFUL.value
+            manager.update(meta)
+            return True
+        times = depth['t']
+        meta.starttime = gj.format_obs_time(times[0])
+        meta.endtime = gj.format_obs_time(times[-1])
     except lf.PacketTranscriptionError as e:
-        print(f"Error reading packet from WIBL file: {str(e)}")
+        logger.error('Error reading packet from WIBL file: %s', e)
     except ts.NoTimeSource:
         manager.logmsg(f'error: failed to convert data({local_file}): no time source known.')
         manager.update(meta)
@@ -116,70 +210,157 @@ def process_item(item: ds.DataItem, controller: ds.CloudController, notifier: nt
         manager.update(meta)
         return False
 
-    if verbose:
-        print('Converting remaining data to GeoJSON format ...')
+    logger.info('Converting remaining data to GeoJSON byte stream for transmission ...')
+    # The GeoJSON is encoded as it's generated, rather than building the complete structure and then encoding it.
+    buffer = io.BytesIO()
     try:
-        submit_data = gj.translate(source_data, lineage, local_file, config)
+        submit_data = gj.translate_stream(source_data, lineage, local_file, config, buffer)
+        # The sounding arrays aren't needed once they're encoded, so release them before the upload
+        del source_data
     except UnknownAlgorithm as e:
         manager.logmsg(str(e))
         manager.update(meta)
-        print(f"Aborting pocessing due to error: {str(e)}")
+        logger.error('Aborting processing due to error: %s', e)
         return False
 
+    properties = submit_data.get('properties') or {}
+    trusted_node = properties.get('trustedNode') or {}
     try:
-        source_id = submit_data['properties']['trustedNode']['uniqueVesselID']
+        source_id = trusted_node['uniqueVesselID']
     except KeyError as e:
-        print(f'error: KeyError while reading uniqueVesselID, submit_data was: {submit_data}')
+        logger.error('KeyError while reading uniqueVesselID, submit_data was: %s', submit_data)
         raise e
 
-    source_id = submit_data['properties']['trustedNode']['uniqueVesselID']
-    if verbose:
-        print('Converting GeoJSON to byte stream for transmission ...')
-
-    encoded_data = json.dumps(submit_data).encode('utf-8')
-    item.dest_size = len(encoded_data)
-    if verbose:
-        print('Attempting to send encoded data to S3 staging bucket ...')
-    controller.transmit(item, source_id, meta.logger, meta.soundings, encoded_data)
+    # The buffer is sent as is, rather than through getvalue(), which would make a second copy of the encoded data
+    item.dest_size = buffer.tell()
+    buffer.seek(0)
+    logger.info('Attempting to send encoded data to S3 staging bucket ...')
+    controller.transmit(item, source_id, meta.logger, meta.soundings, buffer)
+    buffer.close()
 
     meta.status = ProcessingStatus.PROCESSING_SUCCESSFUL.value
-    if verbose:
-        print('Attempting to update status via manager...')
+    logger.info('Attempting to update status via manager ...')
     manager.update(meta)
-    if verbose:
-        print('Attempting to notify SNS')
+    logger.info('Attempting to notify SNS ...')
     notifier.notify(item)
     return True
     
     
+def _process_safely(item: ds.DataItem, controller: ds.CloudController, notifier: nt.Notifier,
+                    config: Dict[str,Any]) -> Optional[bool]:
+    """Run process_item() for a single item, so that an unexpected exception doesn't abandon processing of the
+       other items in the same event.  The exception is logged (with traceback), and None is returned instead of
+       a result, so that lambda_handler() can fail the invocation once all of the items have been dealt with.
+    """
+    try:
+        return process_item(item, controller, notifier, config)
+    except Exception:
+        logger.exception('unexpected exception while processing %s', item.source_key)
+        return None
+
+
+def _process_in_child(conn, item: ds.DataItem, config: Dict[str,Any]) -> None:
+    """Process a single item in a forked child process, returning the result through the pipe.  The boto3 clients
+       (and their pooled connections) inherited from the parent can't safely be shared between processes, so the
+       shared S3 and SNS clients are reset when the process forks (see datasource and notification), and the
+       child's controller and notifier build their own on first use.
+    """
+    controller = ds.AWSController(config)
+    notifier = nt.SNSNotifier(getenv('NOTIFICATION_ARN'))
+    conn.send(_process_safely(item, controller, notifier, config))
+    conn.close()
+
+
+def _process_in_processes(items: List[ds.DataItem], config: Dict[str,Any], workers: int) -> List[Optional[bool]]:
+    """Process items in parallel child processes, at most 'workers' at a time, so that the CPU-bound parts of the
+       processing can use all of the vCPUs available.  ProcessPoolExecutor (and multiprocessing's Pool and Queue)
+       need shared memory that AWS Lambda doesn't provide, so each item gets its own process, with the result
+       returned through a Pipe.
+    """
+    ctx = multiprocessing.get_context('fork')
+    results: List[Optional[bool]] = []
+    for start in range(0, len(items), workers):
+        batch = []
+        for item in items[start:start+workers]:
+            recv_conn, send_conn = ctx.Pipe(duplex=False)
+            proc = ctx.Process(target=_process_in_child, args=(send_conn, item, config))
+            proc.start()
+            send_conn.close()
+            batch.append((item, proc, recv_conn))
+        for item, proc, recv_conn in batch:
+            try:
+                results.append(recv_conn.recv())
+            except EOFError:
+                # Child died without reporting a result
+                logger.error('child process for %s exited without a result', item.source_key)
+                results.append(None)
+            proc.join()
+    return results
+
+
 def lambda_handler(event, context):
     try:
-        # The configuration file for the algorithm should be in the same directory as the lambda function file,
-        # and has a "well known" name.  We could attempt to something smarter here, but this is probably enough
-        # for now.
-        config = conf.read_config(get_config_file())
+        config = get_config()
     except conf.BadConfiguration:
         return {
             'statusCode': 400,
             'body': 'Bad configuration'
         }
-    
-    # We instantiate the AWS versions of DataSource and CloudController explicitly, since we can't be using anything
-    # else given the rest of the infrastructure here, which is AWS specific.
+    # Progress messages are logged at INFO, so that they're only formatted (and written to CloudWatch) when the
+    # configuration asks for verbose output.
+    logger.setLevel(logging.INFO if config['verbose'] else logging.WARNING)
+    controller = _controller
+    # Notifications for the items processed here are collected and published in batches, rather than one at a
+    # time.  (Items processed in child processes notify for themselves.)
+    notifier = nt.BatchNotifier(_notifier)
+
+    # We instantiate the AWS version of DataSource explicitly for the same reason as the controller; the source
+    # is specific to the event, however, and so can't be cached.
     # When using direct S3 triggers or custom WIBL lambda-generated SNS event payloads, use:
     source = ds.AWSSource(event, config)
     # When using S3->SNS triggers, use:
     # source = ds.AWSSourceSNSTrigger(event, config)
-    controller = ds.AWSController(config)
-    notifier = nt.SNSNotifier(getenv('NOTIFICATION_ARN'))
-    
+
+    items: List[ds.DataItem] = []
     p = source.nextSource()
     while p is not None:
-        if not process_item(p, controller, notifier, config):
-            print(f'Abandoning processing of {p.source_key} due to errors.')
+        items.append(p)
         p = source.nextSource()
 
+    # Processing is usually dominated by S3 transfers, so when an event carries more than one item, the items are
+    # processed concurrently in threads to overlap the network waits.  Where CPU dominates (large files on a Lambda
+    # with several vCPUs), 'parallel_mode' can be set to 'processes' instead.  A single item is processed directly to
+    # avoid the overhead.
+    workers = min(config.get('parallel', 4), len(items))
+    if workers > 1 and config.get('parallel_mode', 'threads') == 'processes':
+        results = _process_in_processes(items, config, min(workers, os.cpu_count() or 1))
+    elif workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(lambda item: _process_safely(item, controller, notifier, config), items))
+    else:
+        results = [_process_safely(item, controller, notifier, config) for item in items]
+
+    # Notifications that couldn't be sent are reported (here and in the response), but don't fail the invocation:
+    # a retry would reprocess every item in the event, and re-notify those whose notifications were sent.
+    unnotified = [item.source_key for item in notifier.flush()]
+    if unnotified:
+        logger.error('Failed to send notifications for %d items: %s.', len(unnotified), ', '.join(unnotified))
+
+    failures = [item.source_key for item, result in zip(items, results) if not result]
+    if failures:
+        logger.error('Abandoned processing of %d of %d items due to errors: %s.', len(failures), len(items),
+                     ', '.join(failures))
+    # An unexpected exception fails the invocation (once the other items are done), so that Lambda's retry and
+    # dead-letter handling still apply, as they would if the exception had propagated.
+    crashed = [item.source_key for item, result in zip(items, results) if result is None]
+    if crashed:
+        raise RuntimeError(f'unexpected exceptions while processing: {", ".join(crashed)}')
+
+    if unnotified:
+        body = {'message': 'Processing completed; some notifications failed.', 'unnotified': unnotified}
+    else:
+        body = 'Processing completed.'
     return {
         'statusCode': 200,
-        'body': json.dumps('Processing completed.')
+        'body': json.dumps(body)
     }
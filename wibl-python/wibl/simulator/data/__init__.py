@@ -24,16 +24,16 @@
 # OR OTHER DEALINGS IN THE SOFTWARE.
 
 import math
-from typing import NamedTuple, NoReturn, Union, TypeVar, Tuple, Any
-from datetime import datetime, date, timedelta
-import binascii
+from typing import NamedTuple, NoReturn, Union, TypeVar, Tuple, Any, List
+from datetime import datetime, timedelta
 import struct
 import random
 import logging
 
+import numpy as np
 
 import wibl.core.logger_file as lf
-from wibl.simulator.data.writer import Writer
+from wibl.simulator.data.writer import Writer, PacketBatch
 
 
 logger = logging.getLogger(__name__)
@@ -41,17 +41,134 @@ logger = logging.getLogger(__name__)
 
 CLOCKS_PER_SEC = 1_000_000
 EPOCH_START = datetime(1970, 1, 1)
-MAX_RAND = (1 << 31) - 1
+# Default simulation start time (2020-01-01), in clock ticks since EPOCH_START
+EPOCH_2020_US = (datetime(2020, 1, 1) - EPOCH_START) // timedelta(microseconds=1)
+US_PER_DAY = 86_400 * CLOCKS_PER_SEC
+# Clock ticks between reversals of the simulated latitude drift (one hour)
+LATITUDE_REVERSAL_TICKS = 3_600 * CLOCKS_PER_SEC
 MAX_RAD = math.pi * 2
 DUMMY_YAW = random.random() * MAX_RAD
 DUMMY_PITCH = random.random() * MAX_RAD
 DUMMY_ROLL = random.random() * MAX_RAD
 NA_DATA_DOUBLE: float = -1e9
 NA_DATA_UINT32: int = 0xFFFFFFFF
+# Below this many bytes a Python XOR loop beats numpy's per-call overhead; NMEA0183
+# sentences are at most 82 characters, so the numpy path only serves longer inputs.
+CHECKSUM_NUMPY_MIN_BYTES = 96
+# Number of normal variates a State draws in pure Python before switching to the compiled
+# generator (if numba is available).  Importing numba and compiling costs far more than a typical
+# simulation spends in unit_normal(), so this only pays off for very long runs.
+JIT_NORMAL_THRESHOLD = 1 << 20
+
+# Packet layouts for the buffer constructors, compiled once
+_ST_SYSTIME = struct.Struct('<HdLB')
+_ST_ATTITUDE = struct.Struct('<HdIddd')
+_ST_GNSS = struct.Struct('<HdIHddddBBBdddBBHd')
+_ST_DEPTH = struct.Struct('<HdIddd')
+_ST_ELAPSED = struct.Struct('<I')
+
+# Fixed fields of the simulated GNSS and depth packets for the data constructors
+_GNSS_CONSTANTS = {
+    'altitude': -19.323,
+    'rx_type': 0,   # GPS
+    'rx_method': 2, # DGNSS
+    'num_svs': 12,
+    'horizontal_dop': 1.5,
+    'position_dop': 2.2,
+    'sep': 22.3453,
+    'n_refs': 1,
+    'refs_type': 4, # All constellations
+    'refs_id': 12312,
+    'correction_age': 2.32
+}
+_DEPTH_CONSTANTS = {
+    'offset': 0.0,
+    'range': 200.0
+}
+
+
+_random = random.random
+
+
+class SentenceTemplate:
+    """
+    Format an NMEA0183 sentence with fixed text before and after the variable fields, adding the checksum and
+    line ending.  The fixed text's contribution to the checksum is computed once, so only the formatted fields
+    have to be checksummed for each sentence.
+    """
+    __slots__ = ('_format', '_fixed_checksum', '_start', '_end')
+
+    def __init__(self, prefix: bytes, fields: bytes, trailer: bytes):
+        """
+        :param prefix: Fixed start of the sentence, including the leading '$'
+        :param fields: Format (for bytes %) of the variable part of the sentence
+        :param trailer: Fixed end of the sentence, including the '*' that introduces the checksum
+        """
+        self._format: bytes = prefix + fields + trailer
+        self._fixed_checksum: int = 0
+        for b in prefix[1:] + trailer[:-1]:
+            self._fixed_checksum ^= b
+        self._start: int = len(prefix)
+        self._end: int = -len(trailer)
+
+    def format(self, values: tuple) -> bytes:
+        """
+        Generate a complete sentence
+        :param values: Values for the variable fields
+        :return: Sentence with checksum and CR-LF
+        """
+        msg = self._format % values
+        chk = self._fixed_checksum
+        for b in memoryview(msg)[self._start:self._end]:
+            chk ^= b
+        return msg + b'%02X\r\n' % chk
+
+
+ZDA_SENTENCE = SentenceTemplate(b'$GPZDA,', b'%02d%02d%06.3f,%02d,%02d,%04d', b',00,00*')
+# The remainder of the GGA message, after the position, is dummy data
+GGA_SENTENCE = SentenceTemplate(b'$GPGGA,', b'%02d%02d%06.3f,%02d%09.6f,%c,%03d%09.6f,%c',
+                                b',3,12,1.0,-19.5,M,22.5,M,0.0,0000*')
+DBT_SENTENCE = SentenceTemplate(b'$SDDBT,', b'%.1f,f,%.1f,M,%.1f', b',F*')
 
 
 def unit_uniform() -> float:
-    return random.uniform(0, MAX_RAND) / MAX_RAND
+    return _random()
+
+
+def _box_muller(state: np.ndarray) -> float:
+    # Same polar Box-Muller as State.unit_normal(), but keeping the spare variate in
+    # ``state`` (flag, value) so that it can be compiled; uses NumPy's generator, which numba
+    # provides natively, rather than the random module.
+    if state[0] != 0.0:
+        state[0] = 0.0
+        return state[1]
+    while True:
+        v1 = 2.0 * np.random.random() - 1.0
+        v2 = 2.0 * np.random.random() - 1.0
+        rsq = v1 * v1 + v2 * v2
+        if not (rsq >= 1.0 or rsq == 0.0):
+            break
+    fac = math.sqrt(-2.0 * math.log(rsq) / rsq)
+    state[0] = 1.0
+    state[1] = v1 * fac
+    return v2 * fac
+
+
+# Compiled version of _box_muller(), or False if it can't be compiled; numba is only imported the
+# first time that a State has drawn enough variates to need it.
+_normal = None
+
+
+def _compiled_normal():
+    global _normal
+    if _normal is None:
+        try:
+            from numba import njit
+            _normal = njit(cache=True)(_box_muller)
+        except (ImportError, RuntimeError):
+            # RuntimeError is raised if there's nowhere to cache the compiled code (e.g., read-only install)
+            _normal = False
+    return _normal or None
 
 
 class FormattedAngle(NamedTuple):
@@ -70,26 +187,74 @@ class FormattedAngle(NamedTuple):
     hemisphere: int
 
 
+_fabs = math.fabs
+_tuple_new = tuple.__new__
+
+
 def format_angle(angle: float) -> FormattedAngle:
     """
     Convert an angle in decimal degrees into integer degrees and decimal minutes, with hemispehere indicator
     :param angle:
     :return: FormattedAngle
     """
-    if angle > 0.0:
-        out_hemi = 1
-        out_angle = angle
-    else:
-        out_hemi = 0
-        out_angle = -angle
+    out_angle = _fabs(angle)
+    out_degrees = int(out_angle)
+
+    # Build the tuple directly: NamedTuple's generated __new__ costs more than the arithmetic here
+    return _tuple_new(FormattedAngle, (out_degrees, out_angle - out_degrees, int(angle > 0.0)))
 
+
+def _gga_angle(angle: float, positive: bytes, negative: bytes) -> Tuple[int, float, bytes]:
+    """
+    As format_angle(), but returning a plain tuple with the hemisphere already converted to the character
+    used in the GGA sentence, so that the position can be unpacked straight into the sentence's fields
+    :param angle: Angle in decimal degrees
+    :param positive: Hemisphere character for angles greater than zero
+    :param negative: Hemisphere character otherwise
+    :return: Tuple of (integer degrees, decimal minutes, hemisphere character)
+    """
+    out_angle = _fabs(angle)
     out_degrees = int(out_angle)
-    out_minutes = out_angle - out_degrees
+    return out_degrees, out_angle - out_degrees, positive if angle > 0.0 else negative
+
 
-    return FormattedAngle(degrees=out_degrees, minutes=out_minutes, hemisphere=out_hemi)
+def civil_from_days(days: int) -> Tuple[int, int, int]:
+    """
+    Convert a count of days since the Unix epoch into a proleptic Gregorian (year, month, day),
+    using integer arithmetic only (H. Hinnant's days-to-civil algorithm)
+    :param days: Days since 1970-01-01
+    :return: Tuple of (year, month, day)
+    """
+    z = days + 719_468
+    era = z // 146_097
+    doe = z - era * 146_097
+    yoe = (doe - doe // 1460 + doe // 36_524 - doe // 146_096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    day = doy - (153 * mp + 2) // 5 + 1
+    month = mp + 3 if mp < 10 else mp - 9
+    return yoe + era * 400 + (month <= 2), month, day
+
+
+def days_from_civil(year: int, month: int, day: int) -> int:
+    """
+    Convert a proleptic Gregorian date into a count of days since the Unix epoch; the inverse of civil_from_days()
+    :param year:
+    :param month:
+    :param day:
+    :return: Days since 1970-01-01
+    """
+    year -= month <= 2
+    era = year // 400
+    yoe = year - era * 400
+    doy = (153 * (month - 3 if month > 2 else month + 9) + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146_097 + doe - 719_468
 
 
 class TickCountMillisecondsMixin:
+    __slots__ = ()
+
     def tick_count_to_milliseconds(self) -> int:
         """
         Convert from internal count to milliseconds
@@ -109,19 +274,31 @@ class ComponentDateTime(TickCountMillisecondsMixin):
     information to be converted into a number of different formats as required by the NMEA0183 and
     NMEA2000 packets.
     """
+    __slots__ = ('tick_count', '_us', '_days', '_us_in_day', '_civil')
+
     def __init__(self, tick_count: int, *,
                  datetime_timestamp: int = None):
         """
 
         :param tick_count:
         """
+        # Current time is held as integer microseconds since the Unix epoch (i.e., in clock ticks)
         if datetime_timestamp:
-            self._dt: datetime = datetime.utcfromtimestamp(datetime_timestamp)
+            self._set_time(datetime_timestamp * CLOCKS_PER_SEC)
         else:
-            self._dt: datetime = datetime(2020, 1, 1, 0, 0, 0, 0)
+            self._set_time(EPOCH_2020_US)
         self.tick_count = tick_count
-        self._init_time_ticks: int = tick_count
-        self._init_time_sec: int = int(self._init_time_ticks / CLOCKS_PER_SEC)
+
+    def _set_time(self, us: int) -> None:
+        self._us: int = us
+        self._days, self._us_in_day = divmod(us, US_PER_DAY)
+        # (year, month, day), computed on first use for each new day
+        self._civil: Tuple[int, int, int] = None
+
+    def _civil_date(self) -> Tuple[int, int, int]:
+        if self._civil is None:
+            self._civil = civil_from_days(self._days)
+        return self._civil
 
     @property
     def year(self):
@@ -129,7 +306,7 @@ class ComponentDateTime(TickCountMillisecondsMixin):
         Converted Gregorian year
         :return:
         """
-        return self._dt.year if self._dt else None
+        return self._civil_date()[0]
 
     @property
     def month(self):
@@ -137,7 +314,7 @@ class ComponentDateTime(TickCountMillisecondsMixin):
         Month of year
         :return:
         """
-        return self._dt.month if self._dt else None
+        return self._civil_date()[1]
 
     @property
     def day(self):
@@ -145,7 +322,7 @@ class ComponentDateTime(TickCountMillisecondsMixin):
         Day of month
         :return:
         """
-        return self._dt.day if self._dt else None
+        return self._civil_date()[2]
 
     @property
     def day_of_year(self):
@@ -153,9 +330,7 @@ class ComponentDateTime(TickCountMillisecondsMixin):
         Day of the current time within the year
         :return:
         """
-        if self._dt:
-            return (self._dt.date() - date(self._dt.year, 1, 1)).days
-        return None
+        return self._days - days_from_civil(self._civil_date()[0], 1, 1)
 
     @property
     def hour(self):
@@ -163,7 +338,7 @@ class ComponentDateTime(TickCountMillisecondsMixin):
         Hour of the current time with the day-of-year
         :return:
         """
-        return self._dt.hour if self._dt else None
+        return self._us_in_day // 3_600_000_000
 
     @property
     def minute(self):
@@ -171,7 +346,7 @@ class ComponentDateTime(TickCountMillisecondsMixin):
         Minute of the current time within the hour
         :return:
         """
-        return self._dt.minute if self._dt else None
+        return self._us_in_day // 60_000_000 % 60
 
     @property
     def second(self):
@@ -179,9 +354,8 @@ class ComponentDateTime(TickCountMillisecondsMixin):
         Second (with fractions) of the current time within the minute
         :return:
         """
-        if self._dt:
-            return float(self._dt.second) + (self._dt.microsecond / 1000000)
-        return None
+        sec, usec = divmod(self._us_in_day % 60_000_000, CLOCKS_PER_SEC)
+        return float(sec) + (usec / 1000000)
 
     def update(self, new_count: int):
         """
@@ -189,10 +363,11 @@ class ComponentDateTime(TickCountMillisecondsMixin):
         :param new_count:
         :return:
         """
-        delta_tics = new_count - self.tick_count
-        delta_sec = delta_tics / CLOCKS_PER_SEC
-        delta = timedelta(seconds=delta_sec)
-        self._dt = self._dt + delta
+        days = self._days
+        civil = self._civil
+        self._set_time(self._us + new_count - self.tick_count)
+        if self._days == days:
+            self._civil = civil
         self.tick_count = new_count
 
     def days_since_epoch(self) -> int:
@@ -200,16 +375,23 @@ class ComponentDateTime(TickCountMillisecondsMixin):
         Compute and return the number of days since Unix epoch for the current time
         :return:
         """
-        return (self._dt - EPOCH_START).days
+        return self._days
 
     def seconds_in_day(self) -> float:
         """
         Compute and return the total number of seconds for the current time since midnight
         :return:
         """
-        begining_of_day = datetime(self._dt.year, self._dt.month, self._dt.day)
-        delta = self._dt - begining_of_day
-        return delta.seconds + (delta.microseconds / 1_000_000)
+        sec, usec = divmod(self._us_in_day, CLOCKS_PER_SEC)
+        return sec + (usec / 1_000_000)
+
+    def to_datetime(self) -> datetime:
+        """
+        Convert the current time into a (naive, UTC) datetime; the simulator doesn't need this itself, but
+        it's convenient for logging and debugging
+        :return:
+        """
+        return EPOCH_START + timedelta(microseconds=self._us)
 
     def time(self):
         """
@@ -220,6 +402,12 @@ class ComponentDateTime(TickCountMillisecondsMixin):
 
 
 class State(TickCountMillisecondsMixin):
+    __slots__ = ('init_ticks', 'curr_ticks', 'tick_count', 'sim_time', 'current_depth', 'measurement_uncertainty',
+                 'ref_time', 'current_longitude', 'current_latitude', 'target_reference_time', 'target_depth_time',
+                 'target_position_time', 'depth_random_walk', 'position_step', 'latitude_scale',
+                 'last_latitude_reversal', '_iset', '_gset', '_n_normal', '_bm_state', '_pool_size', '_rng',
+                 '_uniform_pool', '_normal_pool', '_uniform_index', '_normal_index')
+
     def __init__(self):
         """
         State objects should only be constructed from within Engine
@@ -262,19 +450,75 @@ class State(TickCountMillisecondsMixin):
         self._iset: bool = False
         # Global state for Gaussian variate generator (from Numerical Recipies)
         self._gset: float = None
+        # Variates drawn so far, and state for the compiled generator once that takes over
+        self._n_normal: int = 0
+        self._bm_state: np.ndarray = np.zeros(2)
+        # Pools of pre-generated variates (see prefetch()), and the next index to use in each
+        self._pool_size: int = 0
+        self._rng: np.random.Generator = None
+        self._uniform_pool: List[float] = None
+        self._normal_pool: List[float] = None
+        self._uniform_index: int = 0
+        self._normal_index: int = 0
 
     def update_ticks(self, ticks: int) -> NoReturn:
         self.curr_ticks = ticks
         self.tick_count = self.curr_ticks - self.init_ticks
 
+    def prefetch(self, n: int) -> None:
+        """
+        Generate uniform and normal variates in batches of n using NumPy, rather than one at a time
+        with the random module.  The pools are refilled whenever they run out.
+        :param n: Number of variates to generate in each batch; zero reverts to per-sample generation
+        :return:
+        """
+        self._pool_size = n
+        if n <= 0:
+            self._uniform_pool = self._normal_pool = None
+            return
+        if self._rng is None:
+            self._rng = np.random.default_rng()
+        self._refill_uniform()
+        self._refill_normal()
+
+    def _refill_uniform(self) -> None:
+        self._uniform_pool = self._rng.random(self._pool_size).tolist()
+        self._uniform_index = 0
+
+    def _refill_normal(self) -> None:
+        self._normal_pool = self._rng.standard_normal(self._pool_size).tolist()
+        self._normal_index = 0
+
+    def unit_uniform(self) -> float:
+        if self._uniform_pool is None:
+            return unit_uniform()
+        if self._uniform_index == self._pool_size:
+            self._refill_uniform()
+        r = self._uniform_pool[self._uniform_index]
+        self._uniform_index += 1
+        return r
+
     def unit_normal(self) -> float:
         fac: float; rsq: float; v1: float; v2: float
         u: float; v: float; r: float
 
+        if self._normal_pool is not None:
+            if self._normal_index == self._pool_size:
+                self._refill_normal()
+            r = self._normal_pool[self._normal_index]
+            self._normal_index += 1
+            return r
+
+        if self._n_normal >= JIT_NORMAL_THRESHOLD and not self._iset:
+            normal = _compiled_normal()
+            if normal is not None:
+                return normal(self._bm_state)
+        self._n_normal += 1
+
         if not self._iset:
             while True:
-                u = unit_uniform()
-                v = unit_uniform()
+                u = _random()
+                v = _random()
                 v1 = 2.0 * u - 1.0
                 v2 = 2.0 * v - 1.0
                 rsq = v1 * v1 + v2 * v2
@@ -300,6 +544,9 @@ class DataGenerator:
     messages for the same position, time, and depths, so that the output data file is consistent with either
     data source.
     """
+    __slots__ = ('_m_verbose', '_m_serial', '_m_binary', '_use_data_constructor', '_duplicate_depth_prob',
+                 '_no_data_prob', '_na_time', '_batch', '_time_emitters', '_position_emitters', '_depth_emitters')
+
     def __init__(self, emit_nmea0183: bool = True, emit_nmea2000: bool = True, *,
                  use_data_constructor: bool = True,
                  duplicate_depth_prob: float = 0.0,
@@ -324,11 +571,25 @@ class DataGenerator:
         self._use_data_constructor = use_data_constructor
         self._duplicate_depth_prob = duplicate_depth_prob
         self._no_data_prob = no_data_prob
+        # Reference time reported when simulating a no-data system time packet
+        self._na_time = ComponentDateTime(NA_DATA_UINT32, datetime_timestamp=NA_DATA_UINT32)
+        # Packets generated by emit(), which are written to the output together
+        self._batch = PacketBatch()
 
         if not emit_nmea0183 and not emit_nmea2000:
             logger.warning('User asked for neither NMEA0183 or NMEA2000; defaulting to generating NMEA2000')
             self._m_binary = True
 
+        # Generators to call for each type of message, fixed at construction so that the emit_* methods
+        # don't have to check the output flags for every packet
+        self._time_emitters = self._select_emitters(self.generate_system_time, self.generate_zda)
+        self._position_emitters = self._select_emitters(self.generate_gnss, self.generate_gga)
+        self._depth_emitters = self._select_emitters(self.generate_depth, self.generate_dbt)
+
+    def _select_emitters(self, binary, serial) -> tuple:
+        return tuple(generator for generator, enabled in ((binary, self._m_binary), (serial, self._m_serial))
+                     if enabled)
+
     V = TypeVar('V', bound=Union[Any])
     def _get_possible_na_values(self,
                                 na_values: Tuple[V, ...],
@@ -346,10 +607,8 @@ class DataGenerator:
         :param output:
         :return:
         """
-        if self._m_binary:
-            self.generate_system_time(state, output)
-        if self._m_serial:
-            self.generate_zda(state, output)
+        for generate in self._time_emitters:
+            generate(state, output)
 
     def emit_position(self, state: State, output: Writer) -> None:
         """
@@ -358,10 +617,8 @@ class DataGenerator:
         :param output:
         :return:
         """
-        if self._m_binary:
-            self.generate_gnss(state, output)
-        if self._m_serial:
-            self.generate_gga(state, output)
+        for generate in self._position_emitters:
+            generate(state, output)
 
     def emit_depth(self, state: State, output: Writer) -> None:
         """
@@ -370,10 +627,33 @@ class DataGenerator:
         :param output:
         :return:
         """
-        if self._m_binary:
-            self.generate_depth(state, output)
-        if self._m_serial:
-            self.generate_dbt(state, output)
+        for generate in self._depth_emitters:
+            generate(state, output)
+
+    def emit(self, state: State, output: Writer, time_change: bool, position_change: bool,
+             depth_change: bool) -> None:
+        """
+        Generate all of the messages due for the current state of the simulator in one pass; this is
+        equivalent to calling emit_time(), emit_position(), and emit_depth() for each change flag that's set,
+        except that the packets are written to the output in one batch.
+        :param state:
+        :param output:
+        :param time_change: Generate timestamping messages
+        :param position_change: Generate position messages
+        :param depth_change: Generate depth messages
+        :return:
+        """
+        batch = self._batch
+        if time_change:
+            for generate in self._time_emitters:
+                generate(state, batch)
+        if position_change:
+            for generate in self._position_emitters:
+                generate(state, batch)
+        if depth_change:
+            for generate in self._depth_emitters:
+                generate(state, batch)
+        batch.flush(output)
 
     def set_verbose(self, verb: bool):
         """
@@ -390,25 +670,16 @@ class DataGenerator:
         :param output: Output writer to use for serialisation of the simulated system time report
         :return:
         """
-        ref_time, = self._get_possible_na_values((ComponentDateTime(NA_DATA_UINT32,
-                                                                    datetime_timestamp=NA_DATA_UINT32),),
-                                                 (state.ref_time,))
+        ref_time, = self._get_possible_na_values((self._na_time,), (state.ref_time,))
+        days = ref_time.days_since_epoch()
+        secs = ref_time.seconds_in_day()
+        ms = ref_time.tick_count_to_milliseconds()
 
         if self._use_data_constructor:
-            data = {
-                'date': ref_time.days_since_epoch(),
-                'timestamp': ref_time.seconds_in_day(),
-                'elapsed_time': ref_time.tick_count_to_milliseconds(),
-                'data_source': 0
-            }
-            pkt: lf.DataPacket = lf.SystemTime(**data)
+            pkt: lf.DataPacket = lf.SystemTime(date=days, timestamp=secs, elapsed_time=ms, data_source=0)
         else:
             # Use buffer constructor
-            buffer = struct.pack('<HdLB',
-                                 ref_time.days_since_epoch(),
-                                 ref_time.seconds_in_day(),
-                                 ref_time.tick_count_to_milliseconds(),
-                                 0)
+            buffer = _ST_SYSTIME.pack(days, secs, ms, 0)
             pkt: lf.DataPacket = lf.SystemTime(buffer=buffer)
 
         output.record(pkt)
@@ -420,25 +691,17 @@ class DataGenerator:
         :param output: Output writer to use for serialisation of the simulated system time report
         :return:
         """
+        ref_time = state.ref_time
+        days = ref_time.days_since_epoch()
+        secs = ref_time.seconds_in_day()
+        ms = ref_time.tick_count_to_milliseconds()
+
         if self._use_data_constructor:
-            data = {
-                'date': state.ref_time.days_since_epoch(),
-                'timestamp': state.ref_time.seconds_in_day(),
-                'elapsed_time': state.ref_time.tick_count_to_milliseconds(),
-                'yaw': DUMMY_YAW,
-                'pitch': DUMMY_PITCH,
-                'roll': DUMMY_ROLL
-            }
-            pkt: lf.DataPacket = lf.Attitude(**data)
+            pkt: lf.DataPacket = lf.Attitude(date=days, timestamp=secs, elapsed_time=ms,
+                                             yaw=DUMMY_YAW, pitch=DUMMY_PITCH, roll=DUMMY_ROLL)
         else:
             # Use buffer constructor
-            buffer = struct.pack('<HdIddd',
-                                 state.ref_time.days_since_epoch(),
-                                 state.ref_time.seconds_in_day(),
-                                 state.ref_time.tick_count_to_milliseconds(),
-                                 DUMMY_YAW,
-                                 DUMMY_PITCH,
-                                 DUMMY_ROLL)
+            buffer = _ST_ATTITUDE.pack(days, secs, ms, DUMMY_YAW, DUMMY_PITCH, DUMMY_ROLL)
             pkt: lf.DataPacket = lf.Attitude(buffer=buffer)
 
         output.record(pkt)
@@ -453,29 +716,16 @@ class DataGenerator:
         # Simulate random generation of no-data values
         lat, lon = self._get_possible_na_values((NA_DATA_DOUBLE, NA_DATA_DOUBLE),
                                                 (state.current_latitude, state.current_longitude,))
+        sim_time = state.sim_time
+        days = sim_time.days_since_epoch()
+        secs = sim_time.seconds_in_day()
+        ms = sim_time.tick_count_to_milliseconds()
+
         if self._use_data_constructor:
-            data = {
-                'date': state.sim_time.days_since_epoch(),
-                'timestamp': state.sim_time.seconds_in_day(),
-                'elapsed_time': state.sim_time.tick_count_to_milliseconds(),
-                'msg_date': state.sim_time.days_since_epoch(),
-                'msg_timestamp': state.sim_time.seconds_in_day(),
-                'latitude': lat,
-                'longitude': lon,
-                'altitude': -19.323,
-                'rx_type': 0,   # GPS
-                'rx_method': 2, # DGNSS
-                'num_svs': 12,
-                'horizontal_dop': 1.5,
-                'position_dop': 2.2,
-                'sep': 22.3453,
-                'n_refs': 1,
-                'refs_type': 4, # All constellations
-                'refs_id': 12312,
-                'correction_age': 2.32
-            }
-
-            pkt: lf.DataPacket = lf.GNSS(**data)
+            pkt: lf.DataPacket = lf.GNSS(date=days, timestamp=secs, elapsed_time=ms,
+                                         msg_date=days, msg_timestamp=secs,
+                                         latitude=lat, longitude=lon,
+                                         **_GNSS_CONSTANTS)
         else:
             # Use buffer constructor
             # H = sim_time.days since epoch
@@ -496,26 +746,25 @@ class DataGenerator:
             # B = ref station type
             # H = ref station ID
             # d = correction age
-            buffer = struct.pack('<HdIHddddBBBdddBBHd',
-                                 state.sim_time.days_since_epoch(),
-                                 state.sim_time.seconds_in_day(),
-                                 state.sim_time.tick_count_to_milliseconds(),
-                                 state.sim_time.days_since_epoch(),
-                                 state.sim_time.seconds_in_day(),
-                                 lat,
-                                 lon,
-                                 -19.323,
-                                 0,  # GPS
-                                 2,  # DGNSS
-                                 12,
-                                 1.5,
-                                 2.2,
-                                 22.3453,
-                                 1,
-                                 4,  # All constellations
-                                 12312,
-                                 2.32
-                                 )
+            buffer = _ST_GNSS.pack(days,
+                                   secs,
+                                   ms,
+                                   days,
+                                   secs,
+                                   lat,
+                                   lon,
+                                   -19.323,
+                                   0,  # GPS
+                                   2,  # DGNSS
+                                   12,
+                                   1.5,
+                                   2.2,
+                                   22.3453,
+                                   1,
+                                   4,  # All constellations
+                                   12312,
+                                   2.32
+                                   )
             pkt: lf.DataPacket = lf.GNSS(buffer=buffer)
 
         output.record(pkt)
@@ -529,18 +778,14 @@ class DataGenerator:
         """
         # Simulate random generation of no-data values
         depth, = self._get_possible_na_values((NA_DATA_DOUBLE,), (state.current_depth,))
+        sim_time = state.sim_time
+        days = sim_time.days_since_epoch()
+        secs = sim_time.seconds_in_day()
+        ms = sim_time.tick_count_to_milliseconds()
 
         if self._use_data_constructor:
-            data = {
-                'date': state.sim_time.days_since_epoch(),
-                'timestamp': state.sim_time.seconds_in_day(),
-                'elapsed_time': state.sim_time.tick_count_to_milliseconds(),
-                'depth': depth,
-                'offset': 0.0,
-                'range': 200.0
-            }
-
-            pkt: lf.DataPacket = lf.Depth(**data)
+            pkt: lf.DataPacket = lf.Depth(date=days, timestamp=secs, elapsed_time=ms, depth=depth,
+                                          **_DEPTH_CONSTANTS)
         else:
             # Use buffer constructor
             # H = sim_time.days since epoch
@@ -549,14 +794,13 @@ class DataGenerator:
             # d = state.curr depth
             # d = offset
             # d = range
-            buffer = struct.pack('<HdIddd',
-                                 state.sim_time.days_since_epoch(),
-                                 state.sim_time.seconds_in_day(),
-                                 state.sim_time.tick_count_to_milliseconds(),
-                                 depth,
-                                 0.0, # offset hard-coded to 0
-                                 200.0 # range hard-coded to 200
-                                 )
+            buffer = _ST_DEPTH.pack(days,
+                                    secs,
+                                    ms,
+                                    depth,
+                                    0.0, # offset hard-coded to 0
+                                    200.0 # range hard-coded to 200
+                                    )
             pkt: lf.DataPacket = lf.Depth(buffer=buffer)
 
         output.record(pkt)
@@ -572,27 +816,16 @@ class DataGenerator:
         :param output: Output writer to use for serialisation of the simulated ZDA report
         :return:
         """
-        msg = "$GPZDA,{hour:02d}{minute:02d}{second:06.3f},{day:02d},{month:02d},{year:04d},00,00*".format(
-            hour=state.sim_time.hour,
-            minute=state.sim_time.minute,
-            second=state.sim_time.second,
-            day=state.sim_time.day,
-            month=state.sim_time.month,
-            year=state.sim_time.year
-        )
-        chksum = DataGenerator.compute_checksum(msg)
-        msg = f"{msg}{chksum:02X}\r\n"
+        t = state.sim_time
+        ms = t.tick_count_to_milliseconds()
+        msg = ZDA_SENTENCE.format((t.hour, t.minute, t.second, t.day, t.month, t.year))
 
         if self._use_data_constructor:
-            data = {'payload': bytes(msg, 'ascii'),
-                    'elapsed_time': state.sim_time.tick_count_to_milliseconds()
-                    }
-
-            pkt: lf.DataPacket = lf.SerialString(**data)
+            pkt: lf.DataPacket = lf.SerialString(payload=msg, elapsed_time=ms)
         else:
             # Use buffer constructor
-            elapsed_bytes = struct.pack('<I', state.sim_time.tick_count_to_milliseconds())
-            buffer = elapsed_bytes + bytes(msg, 'ascii')
+            elapsed_bytes = _ST_ELAPSED.pack(ms)
+            buffer = elapsed_bytes + msg
             pkt: lf.DataPacket = lf.SerialString(buffer=buffer)
 
         output.record(pkt)
@@ -608,40 +841,18 @@ class DataGenerator:
         :param output: Output writer to use for serialisation of the simulated GGA report
         :return:
         """
-        msg = "$GPGGA,{hour:02d}{minute:02d}{second:06.3f}".format(
-            hour=state.sim_time.hour,
-            minute=state.sim_time.minute,
-            second=state.sim_time.second
-        )
-        formatted_angle = format_angle(state.current_latitude)
-        msg = "{msg},{degrees:02d}{minutes:09.6f},{hemisphere}".format(
-            msg=msg,
-            degrees=formatted_angle.degrees,
-            minutes=formatted_angle.minutes,
-            hemisphere='N' if formatted_angle.hemisphere == 1 else 'S'
-        )
-        formatted_angle = format_angle(state.current_longitude)
-        msg = "{msg},{degrees:03d}{minutes:09.6f},{hemisphere}".format(
-            msg=msg,
-            degrees=formatted_angle.degrees,
-            minutes=formatted_angle.minutes,
-            hemisphere='E' if formatted_angle.hemisphere == 1 else 'W'
-        )
-        # Dummy remainder of message
-        msg = f"{msg},3,12,1.0,-19.5,M,22.5,M,0.0,0000*"
-        chksum = DataGenerator.compute_checksum(msg)
-        msg = f"{msg}{chksum:02X}\r\n"
+        t = state.sim_time
+        ms = t.tick_count_to_milliseconds()
+        msg = GGA_SENTENCE.format((t.hour, t.minute, t.second,
+                                   *_gga_angle(state.current_latitude, b'N', b'S'),
+                                   *_gga_angle(state.current_longitude, b'E', b'W')))
 
         if self._use_data_constructor:
-            data = {'payload': bytes(msg, 'ascii'),
-                    'elapsed_time': state.sim_time.tick_count_to_milliseconds()
-                    }
-
-            pkt: lf.DataPacket = lf.SerialString(**data)
+            pkt: lf.DataPacket = lf.SerialString(payload=msg, elapsed_time=ms)
         else:
             # Use buffer constructor
-            elapsed_bytes = struct.pack('<I', state.sim_time.tick_count_to_milliseconds())
-            buffer = elapsed_bytes + bytes(msg, 'ascii')
+            elapsed_bytes = _ST_ELAPSED.pack(ms)
+            buffer = elapsed_bytes + msg
             pkt: lf.DataPacket = lf.SerialString(buffer=buffer)
 
         output.record(pkt)
@@ -659,27 +870,17 @@ class DataGenerator:
             depth_metres: float = override_depth
         else:
             depth_metres: float = state.current_depth + state.measurement_uncertainty * state.unit_normal()
-        depth_feet: float = depth_metres * 3.2808
-        depth_fathoms: float = depth_metres * 0.5468
 
-        msg = "$SDDBT,{feet:.1f},f,{metres:.1f},M,{fathoms:.1f},F*".format(
-            feet=depth_feet,
-            metres=depth_metres,
-            fathoms=depth_fathoms
-        )
-        chksum = DataGenerator.compute_checksum(msg)
-        msg = f"{msg}{chksum:02X}\r\n"
+        ms = state.sim_time.tick_count_to_milliseconds()
+        # Depth in feet, metres, and fathoms
+        msg = DBT_SENTENCE.format((depth_metres * 3.2808, depth_metres, depth_metres * 0.5468))
 
         if self._use_data_constructor:
-            data = {'payload': bytes(msg, 'ascii'),
-                    'elapsed_time': state.sim_time.tick_count_to_milliseconds()
-                    }
-
-            pkt: lf.DataPacket = lf.SerialString(**data)
+            pkt: lf.DataPacket = lf.SerialString(payload=msg, elapsed_time=ms)
         else:
             # Use buffer constructor
-            elapsed_bytes = struct.pack('<I', state.sim_time.tick_count_to_milliseconds())
-            buffer = elapsed_bytes + bytes(msg, 'ascii')
+            elapsed_bytes = _ST_ELAPSED.pack(ms)
+            buffer = elapsed_bytes + msg
             pkt: lf.DataPacket = lf.SerialString(buffer=buffer)
 
         output.record(pkt)
@@ -689,14 +890,19 @@ class DataGenerator:
             output.record(pkt)
 
     @staticmethod
-    def compute_checksum(msg: str) -> int:
+    def compute_checksum(msg: Union[str, bytes, bytearray]) -> int:
         """
         Compute a NMEA0183 sentence checksum
-        :param msg:
+        :param msg: Sentence from the leading '$' up to and including the '*'
         :return:
         """
+        if isinstance(msg, str):
+            msg = msg.encode('ascii')
+        n = len(msg) - 2
+        if n >= CHECKSUM_NUMPY_MIN_BYTES:
+            return int(np.bitwise_xor.reduce(np.frombuffer(msg, dtype=np.uint8, count=n, offset=1)))
         chk: int = 0
-        for b in binascii.a2b_qp(msg[1:-1]):
+        for b in memoryview(msg)[1:-1]:
             chk ^= b
         return chk
 
@@ -705,12 +911,18 @@ class Engine:
     """
     Run the core simulator for NMEA data output
     """
-    def __init__(self, data_generator: DataGenerator):
+    __slots__ = ('_m_state', '_m_generator')
+
+    def __init__(self, data_generator: DataGenerator, *, prefetch: int = 0):
         """
         Default constructor for a simulation engine
+        :param data_generator: Converter from simulator state to output packets
+        :param prefetch: If non-zero, generate random variates in batches of this size (see State.prefetch())
         """
         # current state information
         self._m_state = State()
+        if prefetch > 0:
+            self._m_state.prefetch(prefetch)
         # converter for state to output representation
         self._m_generator = data_generator
 
@@ -721,12 +933,13 @@ class Engine:
         :param now: Elapsed time count for the current state instant
         :return: True if the state was updated, otherwise false
         """
-        if now < self._m_state.target_reference_time:
+        state = self._m_state
+        if now < state.target_reference_time:
             return False
 
-        self._m_state.ref_time.update(now)
+        state.ref_time.update(now)
 
-        self._m_state.target_reference_time = self._m_state.ref_time.tick_count + CLOCKS_PER_SEC
+        state.target_reference_time = state.ref_time.tick_count + CLOCKS_PER_SEC
 
         return True
 
@@ -737,17 +950,18 @@ class Engine:
         :param now: Elapsed time count for the current state instant
         :return: True if the state was updated, otherwise false
         """
-        if now < self._m_state.target_position_time:
+        state = self._m_state
+        if now < state.target_position_time:
             return False
 
-        self._m_state.current_latitude += self._m_state.latitude_scale * self._m_state.position_step
-        self._m_state.current_longitude += 1.0 * self._m_state.position_step
+        state.current_latitude += state.latitude_scale * state.position_step
+        state.current_longitude += 1.0 * state.position_step
 
-        if (now - self._m_state.last_latitude_reversal) / 3600.0 > CLOCKS_PER_SEC:
-            self._m_state.latitude_scale = -self._m_state.latitude_scale
-            self._m_state.last_latitude_reversal = now
+        if now - state.last_latitude_reversal > LATITUDE_REVERSAL_TICKS:
+            state.latitude_scale = -state.latitude_scale
+            state.last_latitude_reversal = now
 
-        self._m_state.target_position_time = now + CLOCKS_PER_SEC
+        state.target_position_time = now + CLOCKS_PER_SEC
         return True
 
     def step_depth(self, now: int) -> bool:
@@ -757,12 +971,13 @@ class Engine:
         :param now:
         :return:
         """
-        if now < self._m_state.target_depth_time:
+        state = self._m_state
+        if now < state.target_depth_time:
             return False
 
-        self._m_state.current_depth += self._m_state.depth_random_walk * self._m_state.unit_normal()
+        state.current_depth += state.depth_random_walk * state.unit_normal()
 
-        self._m_state.target_depth_time = now + CLOCKS_PER_SEC + int(CLOCKS_PER_SEC * unit_uniform())
+        state.target_depth_time = now + CLOCKS_PER_SEC + int(CLOCKS_PER_SEC * state.unit_uniform())
 
         return True
 
@@ -775,20 +990,16 @@ class Engine:
         :param output:
         :return:
         """
-        next_time: int = min(self._m_state.target_depth_time, self._m_state.target_position_time)
-        next_time = min(next_time, self._m_state.target_reference_time)
+        state = self._m_state
+        next_time: int = min(state.target_depth_time, state.target_position_time, state.target_reference_time)
 
-        self._m_state.sim_time.update(next_time)
+        state.sim_time.update(next_time)
 
-        time_change: bool = self.step_time(next_time)
-        position_change: bool = self.step_position(next_time)
-        depth_change: bool = self.step_depth(next_time)
+        # Only step the components that are due (each step_* would return False otherwise)
+        time_change: bool = next_time >= state.target_reference_time and self.step_time(next_time)
+        position_change: bool = next_time >= state.target_position_time and self.step_position(next_time)
+        depth_change: bool = next_time >= state.target_depth_time and self.step_depth(next_time)
 
-        if time_change:
-            self._m_generator.emit_time(self._m_state, output)
-        if position_change:
-            self._m_generator.emit_position(self._m_state, output)
-        if depth_change:
-            self._m_generator.emit_depth(self._m_state, output)
+        self._m_generator.emit(state, output, time_change, position_change, depth_change)
 
         return next_time
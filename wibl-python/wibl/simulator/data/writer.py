@@ -24,7 +24,7 @@
 # OR OTHER DEALINGS IN THE SOFTWARE.
 
 from abc import ABC
-from typing import BinaryIO
+from typing import BinaryIO, List
 import io
 
 from wibl.core.logger_file import DataPacket, Metadata, SerialiserVersion, \
@@ -40,6 +40,9 @@ SERIALISER_VERSION_NMEA2000 = (1, 0, 0)
 SERIALISER_VERSION_NMEA0183 = (1, 0, 0)
 # IMU version
 SERIALISER_VERSION_IMU = (1, 0, 0)
+# Size of the buffer in front of output files; packets for many simulator steps are collected before
+# each write to the file
+FILE_BUFFER_SIZE = 1 << 20
 
 
 class Writer(ABC):
@@ -64,14 +67,24 @@ class Writer(ABC):
         """
         pass
 
+    def record_batch(self, packets: List[DataPacket]):
+        """
+        Write a sequence of packets into the underlying data stream, in order
+        :param packets:
+        :return:
+        """
+        for data in packets:
+            self.record(data)
+
 
 class FileWriter(Writer):
     def __init__(self, filename: str, logger_name: str, shipname: str):
         # Keep the filename for logging purposes
         self.filename: str = filename
-        self._file: BinaryIO = open(filename, 'wb')
+        # Unbuffered, since the BufferedWriter below does all of the buffering
+        self._file: BinaryIO = open(filename, 'wb', buffering=0)
         # Current output log file on the SD card
-        self._m_output_log: io.BufferedWriter = io.BufferedWriter(self._file)
+        self._m_output_log: io.BufferedWriter = io.BufferedWriter(self._file, buffer_size=FILE_BUFFER_SIZE)
         # Call super-class constructor to write metadata to underlying stream
         super().__init__(logger_name, shipname)
 
@@ -87,6 +100,14 @@ class FileWriter(Writer):
         """
         data.serialise(self._m_output_log)
 
+    def record_batch(self, packets: List[DataPacket]):
+        """
+        Write a sequence of packets into the current log file with a single write
+        :param packets: Data packets to be written, in order
+        :return:
+        """
+        self._m_output_log.write(b''.join([data.serialised() for data in packets]))
+
 
 class MemoryWriter(Writer):
     def __init__(self, logger_name: str, shipname: str):
@@ -107,6 +128,14 @@ class MemoryWriter(Writer):
         """
         data.serialise(self.writer)
 
+    def record_batch(self, packets: List[DataPacket]):
+        """
+        Write a sequence of packets into the underlying byte array with a single write
+        :param packets: Data packets to be written, in order
+        :return:
+        """
+        self.writer.write(b''.join([data.serialised() for data in packets]))
+
     def getvalue(self) -> bytes:
         """
         Get contents of the underlying ByteIO byffer
@@ -114,3 +143,32 @@ class MemoryWriter(Writer):
         """
         self.writer.flush()
         return self.bio.getvalue()
+
+
+class PacketBatch:
+    """
+    Collect the packets generated for one step of the simulator so that they can be passed to a Writer together.
+    This has the same record() interface as a Writer, so it can stand in for one when generating packets.
+    """
+    __slots__ = ('packets',)
+
+    def __init__(self):
+        self.packets: List[DataPacket] = []
+
+    def record(self, data: DataPacket):
+        """
+        Add a packet to the batch
+        :param data: Data packet to be written later
+        :return:
+        """
+        self.packets.append(data)
+
+    def flush(self, output: Writer):
+        """
+        Write all of the packets collected so far to the output, and empty the batch
+        :param output: Writer to send the packets to
+        :return:
+        """
+        if self.packets:
+            output.record_batch(self.packets)
+            self.packets.clear()
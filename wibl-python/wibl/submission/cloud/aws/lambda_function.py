@@ -32,7 +32,6 @@ import json
 from typing import Dict, Any
 
 import requests
-import boto3
 
 # Local modules
 from wibl.core import getenv
@@ -42,8 +41,6 @@ import wibl.core.notification as nt
 from wibl.submission.cloud.aws import get_config_file
 from wibl_manager import ManagerInterface, MetadataType, GeoJSONMetadata, ReturnCodes, UploadStatus
 
-s3 = boto3.resource('s3')
-
 
 ## Helper function to read a local file with an AWS Lambda event in JSON format
 #
@@ -147,7 +144,7 @@ def transmit_geojson(source_info: Dict[str,Any], provider_id: str, provider_auth
 
 def lambda_handler(event, context):
     try:
-        config = conf.read_config(get_config_file())
+        config = conf.read_config_cached(get_config_file())
     except conf.BadConfiguration:
         return {
             'statusCode':   ReturnCodes.FAILED.value,
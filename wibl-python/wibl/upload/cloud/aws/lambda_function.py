@@ -13,7 +13,7 @@ def lambda_handler(event, context):
         # The configuration file for the algorithm should be in the same directory as the lambda function file,
         # and has a "well known" name.  We could attempt to something smarter here, but this is probably enough
         # for now.
-        config = conf.read_config(get_config_file())
+        config = conf.read_config_cached(get_config_file())
     except conf.BadConfiguration as e:
         return {
             'statusCode': 400,
@@ -70,7 +70,7 @@ def validate_metadata(local_file: str, config: Dict[str,Any]) -> bool:
 
 def lambda_handler(event, context):
     try:
-        config = conf.read_config(get_config_file())
+        config = conf.read_config_cached(get_config_file())
     except conf.BadConfiguration:
         return {
             'statusCode':   ReturnCodes.FAILED.value,
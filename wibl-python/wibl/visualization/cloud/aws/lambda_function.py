@@ -2,8 +2,6 @@ from pathlib import Path
 import tempfile
 from typing import List
 
-import boto3
-
 from wibl import config_logger_service
 from wibl.core import getenv
 import wibl.core.config as conf
@@ -15,7 +13,6 @@ from wibl.visualization.soundings import map_soundings
 
 
 logger = config_logger_service()
-s3 = boto3.resource('s3')
 
 
 def lambda_handler(event, context):
@@ -23,7 +20,7 @@ def lambda_handler(event, context):
         # The configuration file for the algorithm should be in the same directory as the lambda function file,
         # and has a "well known" name.  We could attempt to something smarter here, but this is probably enough
         # for now.
-        config = conf.read_config(get_config_file())
+        config = conf.read_config_cached(get_config_file())
     except conf.BadConfiguration:
         return {
             'statusCode': 400,
@@ -79,7 +76,7 @@ def lambda_handler(event, context):
                                                     delete=False)
     merged_geojson_path: Path = Path(merged_geojson_fp.name)
     try:
-        merge_geojson(generate_get_s3_object(s3.meta.client),
+        merge_geojson(generate_get_s3_object(ds.s3_client()),
                       source_store, source_keys, merged_geojson_fp,
                       fail_on_error=True)
     except Exception as e: